@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Spectrum of raw EMG channels, for the check that a channel holds muscle activity before it is scaled
+
+The spectrum is the Welch estimate - the average over overlapping segments of the channel - which is steadier than
+one FFT of the whole trial and costs the same however long the trial is. For each channel get_emgSpectra gives
+    peak_freq       frequency with the most power (the dominant frequency) in Hz
+    mean_freq       power weighted mean frequency in Hz
+    median_freq     frequency that splits the power in half in Hz
+    band_power      power between emg_band[0] and emg_band[1] Hz
+    total_power     power over all frequencies
+
+Results are kept per (gcd file, channel, hash of the channel samples) in spectrum_cache_folder, one small file per gcd
+named by a hash of its path, so running the EMG step again on a file that has not changed does not recompute them.
+Only numbers are stored, no names or paths. Files not used for spectrum_cache_days are removed by prune_spectrumCache.
+"""
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+import scipy.signal as signal
+
+# length of the Welch segments in seconds (frequency resolution is 1/welch_segment Hz), segments overlap by half
+welch_segment       = 0.5
+
+# band of muscle activity used for band_power, Hz - the same band the EMG is filtered to
+emg_band            = (10, 499)
+
+# local folder with the spectra already worked out, set to '' to work them out every time
+spectrum_cache_folder = os.path.join(os.path.expanduser('~'), 'SGMreportCache', 'emg_spectra')
+
+# cache files of gcd files that have not been scaled for this many days are removed
+spectrum_cache_days = 90
+
+def get_channelSpectra(emg, SR):
+    # Welch spectrum statistics of one channel, or of a 2D array with one channel per row (all the same length)
+    emg = np.atleast_2d(emg)
+    nperseg = max(min(emg.shape[-1], int(round(welch_segment*SR))), 1)
+    freqs, psd = signal.welch(emg, fs=SR, nperseg=nperseg, axis=-1)
+    df = freqs[1] - freqs[0] if len(freqs) > 1 else 1.0
+
+    total_power = psd.sum(axis=-1)
+    cumulative_power = np.cumsum(psd, axis=-1)
+    in_band = (freqs >= emg_band[0]) & (freqs <= emg_band[1])
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_freq = (psd*freqs).sum(axis=-1)/total_power
+
+    stats = {'peak_freq':   freqs[np.argmax(psd, axis=-1)],
+             'mean_freq':   mean_freq,
+             'median_freq': freqs[np.argmax(cumulative_power >= cumulative_power[:, -1:]/2, axis=-1)],
+             'band_power':  psd[:, in_band].sum(axis=-1)*df,
+             'total_power': total_power*df,
+             }
+    # one dict of plain floats per channel, so they can be kept in the json cache
+    return [{name: float(values[row]) for name, values in stats.items()} for row in range(emg.shape[0])]
+
+def get_emgSpectra(filenamepath, channels, SR):
+    # spectrum statistics of each channel ({channel name: samples}) of a gcd file, from the cache when the samples,
+    # sample rate and segment length are the same as last time
+    cache_path = get_spectrumCachePath(filenamepath)
+    cache = read_spectrumCache(cache_path)
+    settings = [SR, welch_segment, list(emg_band)]
+
+    spectra = {}
+    missing = {}
+    for channel, emg in channels.items():
+        content_hash = hashlib.sha1(np.ascontiguousarray(emg, dtype=float).tobytes()).hexdigest()
+        entry = cache.get(channel)
+        if entry and entry['hash'] == content_hash and entry['settings'] == settings:
+            spectra[channel] = entry['stats']
+        else:
+            missing[channel] = content_hash
+
+    # channels not in the cache, those of the same length worked out together
+    channel_groups = {}
+    for channel in missing:
+        channel_groups.setdefault(len(channels[channel]), []).append(channel)
+    for group in channel_groups.values():
+        group_stats = get_channelSpectra(np.stack([channels[channel] for channel in group]), SR)
+        for channel, stats in zip(group, group_stats):
+            spectra[channel] = stats
+            cache[channel] = {'hash': missing[channel], 'settings': settings, 'stats': stats}
+
+    if missing:
+        # only the channels the file has now are kept
+        save_spectrumCache(cache_path, {channel: cache[channel] for channel in channels})
+    elif cache_path:
+        # still in use, so not pruned
+        try:
+            os.utime(cache_path)
+        except OSError:
+            pass
+    return spectra
+
+def get_spectrumCachePath(filenamepath):
+    # cache file of one gcd, named by a hash of its path so the patient folder names are not in the cache folder
+    if not spectrum_cache_folder:
+        return ''
+    path_hash = hashlib.sha1(os.path.normcase(os.path.abspath(filenamepath)).encode('utf-8')).hexdigest()
+    return os.path.join(spectrum_cache_folder, path_hash + '.json')
+
+def read_spectrumCache(cache_path):
+    if not cache_path:
+        return {}
+    try:
+        with open(cache_path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_spectrumCache(cache_path, cache):
+    # each gcd has its own file, so workers scaling different files never write the same one
+    if not cache_path:
+        return
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        # write to a temporary file and swap it in, so a half written cache file is never read
+        with open(cache_path + '.tmp', 'w') as f:
+            json.dump(cache, f)
+        os.replace(cache_path + '.tmp', cache_path)
+    except (OSError, TypeError, ValueError) as e:
+        print(f'EMG spectrum cache could not be written: {e}')
+
+def prune_spectrumCache():
+    # remove the cache files of gcd files that have not been scaled for spectrum_cache_days
+    if not spectrum_cache_folder or not os.path.isdir(spectrum_cache_folder):
+        return 0
+    oldest = time.time() - spectrum_cache_days*24*3600
+    removed = 0
+    with os.scandir(spectrum_cache_folder) as entries:
+        for entry in entries:
+            try:
+                if entry.name.endswith(('.json', '.tmp')) and entry.stat().st_mtime < oldest:
+                    os.remove(entry.path)
+                    removed += 1
+            except OSError:
+                continue
+    return removed
@@ -76,6 +76,10 @@ class KinPageSettings:
                                 -40,-39.5,-25.0]
         
         self.AnglesUnitLabels = ["Degrees","Degrees","Degrees","Degrees","Degrees"]
+
+        # dpi of the data layers (traces, norm bands) in the pdf, drawn as one image per plot so the page stays quick to
+        # open however many trials are overlaid. Text, axes and bookmarks stay vectors. 0 keeps everything vector
+        self.RasterDPI = 0
         
 class SagittalKinPageSettings:
     def __init__(self):
@@ -148,6 +152,9 @@ class SagittalKinPageSettings:
         
         
         self.SagittalKineticsUnitLabels = ["Degrees","Degrees","Degrees","Nm/kg","Watts/kg"]
+
+        # dpi of the data layers in the pdf, 0 keeps everything vector (see KinPageSettings)
+        self.RasterDPI = 0
         
 class CoronalKinPageSettings:
     def __init__(self):
@@ -219,6 +226,9 @@ class CoronalKinPageSettings:
                                                -1.7,-1.7,-1.7]
         
         self.CoronalKineticsUnitLabels = ["Degrees","Degrees","Degrees","Nm/kg","Watts/kg"]
+
+        # dpi of the data layers in the pdf, 0 keeps everything vector (see KinPageSettings)
+        self.RasterDPI = 0
         
 class MuscleLengthVelocityPageSettings:
     def __init__(self):
@@ -290,6 +300,9 @@ class MuscleLengthVelocityPageSettings:
                                             -40.5,0.84,0.84,]          
         
         self.MuscleLengthVelocityUnitLabels = ["Degrees","Degrees","Degrees","Degrees","Degrees"]
+
+        # dpi of the data layers in the pdf, 0 keeps everything vector (see KinPageSettings)
+        self.RasterDPI = 0
         
 class FootKinematicsPageSettings:
     def __init__(self):
@@ -360,6 +373,9 @@ class FootKinematicsPageSettings:
                                     -17.5,-25.5,-40.5]
 
         self.FootAnglesUnitLabels = ["Degrees","Degrees","Degrees","Degrees","Degrees"]
+
+        # dpi of the data layers in the pdf, 0 keeps everything vector (see KinPageSettings)
+        self.RasterDPI = 0
         
 class EMGpageSettings:
     def __init__(self):
@@ -415,4 +431,11 @@ class EMGpageSettings:
                              [15,100,0,0],  # Vastus Lateralis
                              [30,100,0,0],  # MedialHamstrings
                              [25,100,0,0],  # Gastrocnemius
-                             [100,0,0,0]]   # Tibialis Anterior
\ No newline at end of file
+                             [100,0,0,0]]   # Tibialis Anterior
+
+        # raw EMG traces are drawn with the lowest and highest sample of each pixel column at this resolution (dots per inch
+        # of plot width), which keeps the peaks but not the thousands of samples a column cannot show. 0 draws every sample
+        self.EMGTraceDPI = 300
+
+        # dpi of the data layers in the pdf, 0 keeps everything vector (see KinPageSettings)
+        self.RasterDPI = 300
@@ -1,150 +1,183 @@
-# -*- coding: utf-8 -*-
-"""
-Created on Thu May 15 09:59:55 2025
-
-@author: Vicon-OEM
-"""
-
-#import Vicon Nexus Subroutines
-from viconnexusapi import ViconNexus
-vicon = ViconNexus.ViconNexus()
-
-# import other required modules
-import numpy as np
-import scipy.signal as signal
-# import matplotlib.pyplot as plt
-
-
-def get_dominantFFT(data, SR):
-    # 'signal' is the data, 'SR' is the sample rate
-    
-    # number of samples 
-    N = len(data)
-    
-    # subtract mean to reduce issues with dominant frequency analysis due to strong DC component of the signal
-    data = data - np.mean(data)
-    
-    # computer FFT
-    fft_val = np.fft.fft(data)
-    freqs = np.fft.fftfreq(N, d=1/SR) # frequency bins
-    
-    # find dominant frequncy
-    dom_idx = np.argmax(np.abs(fft_val[:N//2])) # only positive frequecy values
-    dom_frq = freqs[dom_idx]
-    
-    # code to plot frequency analysis if desired
-    # **Optional: Plot Frequency Spectrum**
-    # plt.plot(freqs[:N//2], np.abs(fft_val[:N//2]))  # Only positive frequencies
-    # plt.xlabel("Frequency (Hz)")
-    # plt.ylabel("Amplitude")
-    # plt.title("Muscle Activity Frequency Spectrum")
-    # plt.show()
-    
-    return dom_frq
-
-def filt_emgSignal(emg_var, SR):
-    # Design the Butterworth band-pass filter
-    low_cut = 10  # Low cutoff frequency (Hz)
-    high_cut = 499  # High cutoff frequency (Hz)
-    order = 4  # Filter order
-    
-    # Get filter coefficients using 'fs' to specify frequency in Hz
-    b, a = signal.butter(order, [low_cut, high_cut], btype='band', fs=SR)
-    
-    # Apply the filter using filtfilt (zero-phase filtering)
-    emg_filtered = signal.filtfilt(b, a, emg_var)
-    
-    return emg_filtered
-    
-    
-def scale_MLSemg(filenamepath):
-    
-    DeviceIDs = vicon.GetDeviceIDs()
-    for DeviceID in DeviceIDs:
-        [name, typeID, rate, deviceOutputIDs, forceplate, eyetracker] = vicon.GetDeviceDetails(DeviceID)
-        if name == 'EMG':
-            SR = rate
-            print(f'EMG sample rate extracted is: {SR}')
-        
-    # initialize dominant frequency list
-    dfrq_list = []
-    
-    # ----------------------------- Get data ------------------------------
-    f = open(filenamepath, 'r+')
-    data = f.readlines()
-    
-    # ---------------------------- Get headers ----------------------------
-    headerIndex = [idx for idx, line in enumerate(data) if line[0] == '!']
-       
-    # ----------------------------- Convert data --------------------------
-    for idx, num in enumerate(headerIndex):
-        # pull keys and asign to temporary variable
-        key = data[headerIndex[idx]][1:-1]
-        
-        if 'Raw' in key and 'Envelope' not in key:
-            # pull data associated with given emg data, minus "\n" and convert to float
-            try:
-                # get all values of data for key associated with headerIndex[num] up to next headerIndex[num+1]
-                val = data[headerIndex[idx]+1:headerIndex[idx+1]]
-            except:
-                # same as above but for the reamining set of data for the last key
-                val = data[headerIndex[idx]+1:]
-                    
-            # convert values to float
-            values = []
-            
-            for i in val:
-                try:
-                    value = float(i)
-                    values.append(value)    
-                except:
-                    continue
-            
-            # get and apply scaled emg data
-            emg = np.array(values)
-            
-            if 'SR' not in locals():
-                SR = 1000
-                print('EMG sample rate not extracted from Vicon, using default sample rate of 1000 Hz')
-                
-            # frequency analysis            
-            dominant_freq = get_dominantFFT(emg, SR)
-            print(f'dominant frequency is: {dominant_freq}')
-            
-            # physiological frequencies should be found in order to justify scaling data
-            if dominant_freq > 10 and dominant_freq < 501:
-                dfrq_list.append(dominant_freq)
-                
-                # filter emg signal
-                emg_filt = filt_emgSignal(emg, SR)
-                
-                # scale signal if dominant frequency meets criteria
-                scale_val = abs(emg_filt).max()
-                emg_scaled = emg_filt * 4 / scale_val
-                
-                # replace unscaled with scaled data
-                datastring = [str(emgstr)+'\n' for emgstr in emg_scaled]            
-                data[headerIndex[idx]+1:headerIndex[idx]+1+len(datastring)] = datastring
-    
-    # close original file
-    # print(dfrq_list)
-    f.close()
-    
-    if dfrq_list and min(dfrq_list) > 10 and max(dfrq_list) < 501:
-        # save new data over old file
-        with open(filenamepath, 'w') as newfile:
-            for item in data:
-                newfile.write(item)
-            
-            newfile.close()
-    else:
-        print('EMG data not scaled, GCD file not updated')
-
-    
-# call vicon to get file path and file name for trial of interest
-FilePath, FileName = vicon.GetTrialName()
-filenamepath= FilePath + "\\" + FileName + '.GCD'
-
-# call function to check and save emg data - should ignore files without EMG data
-scale_MLSemg(filenamepath)
-
+# -*- coding: utf-8 -*-
+"""
+Created on Thu May 15 09:59:55 2025
+
+@author: Vicon-OEM
+"""
+
+# import other required modules
+import functools
+import os
+import shutil
+import tempfile
+import numpy as np
+import scipy.signal as signal
+# import matplotlib.pyplot as plt
+
+# Welch spectrum of each channel, kept between runs - see EMGspectrum_SGM
+from EMGspectrum_SGM import get_emgSpectra
+
+# trial and EMG sample rate providers (Nexus, file, mock) - see TrialProviders_SGM
+from TrialProviders_SGM import NexusTrialProvider
+
+# where the trial and EMG sample rate come from when they are not given - the trial open in Nexus, which is
+# only connected to when it is asked for something, so the functions here can be used without Nexus
+trial_provider = NexusTrialProvider()
+
+
+@functools.lru_cache(maxsize=None)
+def get_emgFilter(SR):
+    # Design the Butterworth band-pass filter, once per sample rate
+    low_cut = 10  # Low cutoff frequency (Hz)
+    high_cut = 499  # High cutoff frequency (Hz)
+    order = 4  # Filter order
+    
+    # Get filter coefficients using 'fs' to specify frequency in Hz, as second order sections (numerically stable)
+    return signal.butter(order, [low_cut, high_cut], btype='band', fs=SR, output='sos')
+
+def filt_emgSignal(emg_var, SR):
+    # Apply the filter using sosfiltfilt (zero-phase filtering) along the samples
+    # emg_var is one channel, or a 2D array with one channel per row
+    emg_filtered = signal.sosfiltfilt(get_emgFilter(SR), emg_var, axis=-1)
+    
+    return emg_filtered
+    
+    
+def get_emgValues(val):
+    # all lines of an EMG block converted to float in one call - lines that are not numbers (e.g. blank lines) are skipped
+    try:
+        return np.array(''.join(val).split(), dtype=float)
+    except ValueError:
+        # something other than one number per line, convert line by line as before
+        values = []
+        for i in val:
+            try:
+                value = float(i)
+                values.append(value)    
+            except:
+                continue
+        return np.array(values)
+
+def get_emgText(emg):
+    # the whole channel as one block of text, one line per sample - same text as str() of each numpy value
+    return '\n'.join(map(repr, emg.tolist())) + '\n'
+
+def write_gcdLines(filenamepath, data):
+    # written to a temporary file next to the gcd first and then swapped in, so a crash never leaves a half written gcd
+    gcd_folder = os.path.dirname(os.path.abspath(filenamepath))
+    fd, temp_path = tempfile.mkstemp(dir=gcd_folder, prefix='.', suffix='.GCD.tmp')
+    try:
+        with os.fdopen(fd, 'w') as newfile:
+            newfile.writelines(data)
+        shutil.copymode(filenamepath, temp_path)
+        os.replace(temp_path, filenamepath)
+    except:
+        os.remove(temp_path)
+        raise
+
+def get_channelGroups(emg_channels):
+    # header lines of the channels grouped by number of samples, in file order - empty channels have nothing to scale
+    channel_groups = {}
+    for header_line, emg in emg_channels.items():
+        if len(emg):
+            channel_groups.setdefault(len(emg), []).append(header_line)
+    return list(channel_groups.values())
+
+def scale_MLSemg(filenamepath, SR=None, provider=None):
+    # SR is the EMG sample rate, from the provider (trial_provider, i.e. Nexus, if none is given) when not given
+    # returns the sample rate used, the dominant frequency of each EMG channel and whether the file was scaled
+    if SR is None:
+        SR = (provider or trial_provider).get_emgRate(filenamepath)
+        
+    # initialize dominant frequency list
+    dfrq_list = []
+    
+    # ----------------------------- Get data ------------------------------
+    with open(filenamepath, 'r') as f:
+        data = f.readlines()
+    
+    # ---------------------------- Get headers ----------------------------
+    headerIndex = [idx for idx, line in enumerate(data) if line[0] == '!']
+       
+    # ----------------------------- Convert data --------------------------
+    # raw emg of each channel, keyed by the line of its header
+    emg_channels = {}
+    for idx, num in enumerate(headerIndex):
+        # pull keys and asign to temporary variable
+        key = data[headerIndex[idx]][1:-1]
+        
+        if 'Raw' in key and 'Envelope' not in key:
+            # pull data associated with given emg data, minus "\n" and convert to float
+            try:
+                # get all values of data for key associated with headerIndex[num] up to next headerIndex[num+1]
+                val = data[headerIndex[idx]+1:headerIndex[idx+1]]
+            except:
+                # same as above but for the reamining set of data for the last key
+                val = data[headerIndex[idx]+1:]
+                    
+            emg_channels[headerIndex[idx]] = get_emgValues(val)
+            
+    if emg_channels and SR is None:
+        SR = 1000
+        print('EMG sample rate not extracted from Vicon, using default sample rate of 1000 Hz')
+    
+    # ----------------------------- Frequency analysis --------------------
+    # peak of the Welch spectrum of each channel, unchanged channels come from the spectrum cache
+    channel_names = {header_line: data[header_line][1:-1] for header_line in emg_channels}
+    spectra = get_emgSpectra(filenamepath, {channel_names[header_line]: emg for header_line, emg in emg_channels.items() if len(emg)}, SR)
+    
+    # ----------------------------- Scale data ----------------------------
+    # channels with the same number of samples are filtered together, one row per channel
+    dominant_freqs = {}
+    scaled_channels = {}
+    for header_lines in get_channelGroups(emg_channels):
+        emg = np.stack([emg_channels[header_line] for header_line in header_lines])
+        
+        dominant_freq = np.array([spectra[channel_names[header_line]]['peak_freq'] for header_line in header_lines])
+        dominant_freqs.update(zip(header_lines, dominant_freq))
+        
+        # physiological frequencies should be found in order to justify scaling data
+        in_range = (dominant_freq > 10) & (dominant_freq < 501)
+        if in_range.any():
+            # filter emg signal
+            emg_filt = filt_emgSignal(emg[in_range], SR)
+            
+            # scale signal if dominant frequency meets criteria
+            scale_val = np.abs(emg_filt).max(axis=1, keepdims=True)
+            emg_scaled = emg_filt * 4 / scale_val
+            scaled_lines = [header_line for header_line, scale in zip(header_lines, in_range) if scale]
+            scaled_channels.update(zip(scaled_lines, emg_scaled))
+    
+    # in file order, so the printed frequencies are in the same order as before
+    for header_line in emg_channels:
+        if header_line not in dominant_freqs:
+            continue
+        print(f'dominant frequency is: {dominant_freqs[header_line]}')
+        if header_line in scaled_channels:
+            dfrq_list.append(dominant_freqs[header_line])
+    
+    # replace unscaled with scaled data, each channel's lines by one block of text
+    # last channel first, so the header lines of the channels before it stay where they are
+    for header_line in sorted(scaled_channels, reverse=True):
+        emg_scaled = scaled_channels[header_line]
+        data[header_line+1:header_line+1+len(emg_scaled)] = [get_emgText(emg_scaled)]
+    
+    # print(dfrq_list)
+    scaled = bool(dfrq_list) and min(dfrq_list) > 10 and max(dfrq_list) < 501
+    if scaled:
+        # save new data over old file
+        write_gcdLines(filenamepath, data)
+    else:
+        print('EMG data not scaled, GCD file not updated')
+    
+    channel_freqs = {channel_names[header_line]: dominant_freqs[header_line] for header_line in emg_channels if header_line in dominant_freqs}
+    return {'SR': SR, 'dominant_freqs': channel_freqs, 'spectra': spectra, 'scaled': scaled}
+
+
+if __name__ == '__main__':
+    # call vicon to get file path and file name for trial of interest
+    filenamepath = trial_provider.get_trialPath()
+    
+    # call function to check and save emg data - should ignore files without EMG data
+    scale_MLSemg(filenamepath)
+
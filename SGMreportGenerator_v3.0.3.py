@@ -13,15 +13,37 @@ from datetime import datetime as date
 import os 
 import os.path
 import glob
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_pdf import PdfPages
-import seaborn as sns 
-import pandas as pd 
-from matplotlib.gridspec import GridSpec
-
-import numpy as np
-import PyPDF2
+import re
+import argparse
+import types
+import io
+import base64
+import concurrent.futures
+import multiprocessing
+import json
+import hashlib
+import ast
+import pickle
+import threading
+import queue
+import importlib
 import sys
+
+class LazyModule:
+    # stands in for a module and imports it the first time it is used
+    # matplotlib and numpy take a long time to import, this lets the window open first (see start_importWarmup)
+    def __init__(self, module_name):
+        self.module_name = module_name
+        self.module = None
+        
+    def __getattr__(self, name):
+        if self.module is None:
+            self.module = importlib.import_module(self.module_name)
+        return getattr(self.module, name)
+
+plt = LazyModule('matplotlib.pyplot')
+np = LazyModule('numpy')
+
 from PageSettings_SGM import (KinPageSettings as kps,
                         SagittalKinPageSettings as sps,
                         CoronalKinPageSettings as cps,
@@ -39,6 +61,16 @@ norm8_12            = 'TD_Ave_8-12y.GCD'
 norm13_21           = 'TD_Ave_13-21y.GCD'
 norm_all            = 'TD_Ave.GCD'
 
+# local folder for binary copies of parsed gcd files, so re-opening a patient does not re-read every file over the network
+# off ('') by default - the copies hold patient trial data in the folder until they are deleted, only turn it on where
+# that is allowed, e.g. os.path.join(os.path.expanduser('~'), 'SGMreportCache', 'gcd')
+gcd_cache_folder    = ''
+
+# local file with the patient info already read from static python files (name, MRN, DOB ... in plain text), so they
+# are not read again. Off ('') by default, the static files are read every time - only turn it on where keeping that
+# info in a local file is allowed, e.g. os.path.join(os.path.expanduser('~'), 'SGMreportCache', 'static_info.json')
+static_cache_file   = ''
+
 # global normFile
 normFile            = norm_all # defualt norm file, will be reset if program can find patient static python file
 site_name           = 'New England'
@@ -47,6 +79,27 @@ site_name           = 'New England'
 FaceCol             = 'black'
 FaceColAlpha        = 0.1
 
+# page previews while a report is made
+# 'thumbnails' - pages are saved straight to the pdf and shown as thumbnails in the file selection window (click to enlarge)
+# 'windows'    - each page opens in its own window and must be closed before the next page is plotted
+page_preview        = 'thumbnails'
+page_preview_dpi    = 80
+
+# number of worker processes that build the pages of a multi-page report at the same time, 1 plots pages one after another
+# left at 1 - the pages are still written to the pdf one at a time, so time it on the lab pcs first with
+# benchmarks/bench_parallel_report.py, e.g. min(os.cpu_count() or 1, 8) if it is faster there
+render_workers      = 1
+
+# folder levels below the selected patient folder searched for the Static*.py patient file (session folders are 1 level down)
+static_search_depth = 2
+
+# number of background threads that load gcd files as soon as they are ticked, 0 loads files only when plotting
+prefetch_workers    = 2
+
+# raw EMG traces are reduced to the lowest and highest sample in each pixel column of the plot (EMGTraceDPI in PageSettings_SGM)
+# True draws every sample - full fidelity, but larger pdfs that are slower to open
+emg_full_fidelity   = False
+
 ### ----------------------- Initialize selections -----------------------------
 
 # Combobox selections
@@ -77,6 +130,40 @@ fse                 = False                 # indicate whether patient folder ha
 bookmarks           = []
 marknum             = 0
 
+# static python file lookups keyed by patient folder, see find_staticFile
+static_lookups      = {}
+
+# values read from static python files, keyed by file path - loaded from static_cache_file on first use, see get_staticValues
+static_info_cache   = None
+
+# gcd files shown on the select data page, keyed by trial id, see register_trial
+trial_registry      = {}
+
+# patient folder listings, keyed by folder path - reused until the folder's mtime changes, see scan_gcdFolders
+folder_listings     = {}
+
+# parsed gcd trials for the current report session, keyed by (absolute path, mtime, size)
+trial_cache         = {}
+trial_cache_stats   = {'hits': 0, 'misses': 0}
+
+# background loading of ticked trials, see queue_trialPrefetch
+trial_cache_lock    = threading.Lock()  # guards the trial cache and prefetch state, shared with the load threads
+trial_loading       = {}                # trial cache key -> threading.Event, set when the thread parsing that trial is done
+prefetch_queue      = None
+prefetch_queue_size = 64                # ticked trials waiting to load, more than this are loaded when plotting
+prefetch_wanted     = set()             # trial ids that are ticked and should be loaded
+prefetch_status     = {}                # trial id -> 'queued', 'loading', 'loaded' or 'failed'
+prefetch_colors     = {'queued': 'gray50', 'loading': 'dark orange', 'loaded': 'dark green', 'failed': 'red'}
+
+# parsed normative data, keyed by norm file name - norm files do not change during a session
+norm_store          = {}
+
+# pickled page skeletons keyed by (page type, norm file, trial length), see get_pageTemplate
+page_templates      = {}
+
+# EMG norm envelopes interpolated to a trial's EMG length, keyed by (norm file, EMG length), see get_normEnvelopes
+emg_envelopes       = {}
+
 ### ---------------------- User Interface -------------------------------------
 # Primary call to all forms
 class Motion_Report(tk.Tk):
@@ -100,110 +187,174 @@ class Motion_Report(tk.Tk):
         self.frames[PatientStudyInfo_Page].tkraise()
         self.frames[PatientStudyInfo_Page].build_PatientInfoUI()
         
-def get_PatientInfo_fromPyfile(selected_folder, self):
+def get_PatientInfo_fromPyfile(selected_folder):
+    # patient info for the batch reports and anything else that can wait for the static file to be read
+    patient_info = get_staticPatientInfo(selected_folder)
+    set_PatientInfo(patient_info)
+    return patient_info
+
+def set_PatientInfo(patient_info):
     global pid
     global fne
-    global dte
     global brt
-    global det
+    global dte
     global wat
     global age
     
-    # List all files in the directory
-    py_patient_directory = selected_folder + '/**/*.py*'
-    python_files = []
+    pid, fne, brt, dte, wat, age = patient_info
 
-    # initialize variables
-    fne = ['Patient Name']
-    pid = ['1234567']
-    dte = [date.today().strftime('%m-%d-%Y')]
-    brt = [brace_select[0]]
-    wat = [walkaid_select[0]]
-    age = 1
-    
-    # collect files and creation times
+def get_defaultPatientInfo():
+    # pid, fne, brt, dte, wat, age used when there is no static python file
+    return (['1234567'], ['Patient Name'], [brace_select[0]], [date.today().strftime('%m-%d-%Y')], [walkaid_select[0]], 1)
+
+def start_PatientInfoLookup(selected_folder):
+    # read the static python file on a background thread so the window opens right away
+    # returns a future with the patient info, see PatientStudyInfo_Page.poll_PatientInfo
+    lookup_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='patient info')
+    patient_info = lookup_pool.submit(get_staticPatientInfo, selected_folder)
+    lookup_pool.shutdown(wait=False)
+    return patient_info
+
+def get_staticPatientInfo(selected_folder):
+    # patient info from the newest Static*.py file in the patient folder - does not touch globals or widgets, safe off the tk thread
+    # lists are made fresh on each call because the report info is written back into them
     try:
-        for file in glob.glob(py_patient_directory, recursive=True):
-            pyfilename = os.path.basename(file)
-    
-            if pyfilename.endswith('.py') and pyfilename.startswith('Static'):
-                py_filename = file.replace('/','\\')
-                creation_time = os.path.getctime(file)
-                python_files.append((py_filename, creation_time))
-        
-        
-        # sort by creation time - most recent first
-        python_files.sort(key=lambda x: x[1], reverse=True)
+        StaticDataFileName = find_staticFile(selected_folder)
+        if StaticDataFileName is None:
+            print('Static python file not found or could not be accessed. Defualt values used for patient information')
+            return get_defaultPatientInfo()
         
-        sorted_python_files = [file[0] for file in python_files]
-        
-        # If a Python file is found, open and read it
-        if sorted_python_files:
-            try:
-                # for StaticDataFileName in sorted_python_files:
-                # pull first - most recent - static filename
-                StaticDataFileName = sorted_python_files[0]
-                print(f'Patient data pulled from {os.path.basename(StaticDataFileName)} static file')
-                
-                # open python file
-                exec(open(StaticDataFileName).read())
-                
-                # try to extract variables that should exist in the file
-                ################## patient name and id
-                first_name = self.valueFirstName
-                last_name = self.valueLastName
-                pid = [self.valuePatientNumber]
-                fne = [first_name + " " + last_name]
-                
-                ################## brace trial modifier
-                brt = [self.valueTrialModifier]
-                if brt == 'Barefoot':
-                    brt = 'None'
-                
-                ################## date of data collection
-                collect_day = self.valueDataCollectionDate_Day
-                collect_mon = self.valueDataCollectionDate_Month
-                collect_yer = self.valueDataCollectionDate_Year
-                
-                # combine into date string mo-day-year
-                dte = [f'{collect_mon}-{collect_day}-{collect_yer}']
-                
-                ################## patient walk aide used
-                wat = [self.valueAssistiveDevice]
-                
-                ################## patient age at time of collection
-                patient_day = self.valueDateOfBirth_Day
-                patient_month = self.valueDateOfBirth_Month
-                patient_year = self.valueDateOfBirth_Year
-                
-                # Combine strings into a date
-                birth_date_str = f"{patient_year}-{patient_month}-{patient_day}"
-                birth_date = date.strptime(birth_date_str, "%Y-%b-%d")
-                
-                # Format the datetime object to the desired format
-                date.strptime
-                current_date =  date.today()
-                age = current_date.year - birth_date.year - ((current_date.month, current_date.day) < (birth_date.month, birth_date.day))
-                print(f'Patient age is: {age}')
-                # return pid, fne, brt, dte, wat, age
-            except:
-                # fne = ['Patient Name']
-                # pid = ['1234567']
-                # dte = [date.today().strftime('%m-%d-%Y')]
-                # brt = [brace_select[0]]
-                # wat = [walkaid_select[0]]
-                # age = 1
-                print('Static python file not found or could not be accessed. Defualt values used for patient information')
-                # return pid, fne, brt, dte, wat, age
+        static_info = read_staticFile(StaticDataFileName)
     except:
-        # fne = ['Patient Name']
-        # pid = ['1234567']
-        # dte = [date.today().strftime('%m-%d-%Y')]
-        # brt = [brace_select[0]]
-        # wat = [walkaid_select[0]]
-        # age = 1
         print('Static python file not found or could not be accessed. Defualt values used for patient information')
-    return pid, fne, brt, dte, wat, age
+        return get_defaultPatientInfo()
+    
+    print(f'Patient data pulled from {os.path.basename(StaticDataFileName)} static file')
+    print(f"Patient age is: {static_info['age']}")
+    return ([static_info['pid']], [static_info['fne']], [static_info['brt']], [static_info['dte']], [static_info['wat']], static_info['age'])
+
+def find_staticFile(selected_folder):
+    # newest (by creation time) Static*.py in the patient folder or the session folders below it
+    # searched one folder level at a time, stopping at the first level with a static file or at static_search_depth
+    # the answer is kept per patient folder until one of the searched folders changes (its mtime)
+    selected_folder = os.path.abspath(selected_folder)
+    if selected_folder in static_lookups:
+        folder_mtimes, StaticDataFileName = static_lookups[selected_folder]
+        try:
+            if all(os.stat(folder).st_mtime_ns == mtime for folder, mtime in folder_mtimes.items()):
+                return StaticDataFileName
+        except OSError:
+            pass
+    
+    folder_mtimes = {}
+    python_files = []
+    folder_level = [selected_folder]
+    for depth in range(static_search_depth +1):
+        next_level = []
+        for folder in folder_level:
+            folder_mtimes[folder] = os.stat(folder).st_mtime_ns
+            with os.scandir(folder) as folder_entries:
+                for entry in folder_entries:
+                    if entry.is_dir():
+                        next_level.append(entry.path)
+                    elif entry.name.startswith('Static') and entry.name.endswith('.py'):
+                        python_files.append((entry.stat().st_ctime, entry.path))
+        if python_files or not next_level:
+            break
+        folder_level = next_level
+    
+    # most recent static file
+    StaticDataFileName = max(python_files)[1] if python_files else None
+    static_lookups[selected_folder] = (folder_mtimes, StaticDataFileName)
+    return StaticDataFileName
+
+def read_staticFile(StaticDataFileName):
+    # the static python file sets self.value... attributes with the patient info
+    static_values = types.SimpleNamespace(**get_staticValues(StaticDataFileName))
+    
+    # try to extract variables that should exist in the file
+    ################## patient name and id
+    first_name = static_values.valueFirstName
+    last_name = static_values.valueLastName
+    
+    ################## brace trial modifier
+    brace = static_values.valueTrialModifier
+    
+    ################## date of data collection
+    collect_day = static_values.valueDataCollectionDate_Day
+    collect_mon = static_values.valueDataCollectionDate_Month
+    collect_yer = static_values.valueDataCollectionDate_Year
+    
+    ################## patient age at time of collection
+    patient_day = static_values.valueDateOfBirth_Day
+    patient_month = static_values.valueDateOfBirth_Month
+    patient_year = static_values.valueDateOfBirth_Year
+    
+    # Combine strings into a date
+    birth_date_str = f"{patient_year}-{patient_month}-{patient_day}"
+    birth_date = date.strptime(birth_date_str, "%Y-%b-%d")
+    current_date =  date.today()
+    
+    return {'pid': static_values.valuePatientNumber,
+            'fne': first_name + " " + last_name,
+            'brt': brace,
+            'dte': f'{collect_mon}-{collect_day}-{collect_yer}', # combine into date string mo-day-year
+            'wat': static_values.valueAssistiveDevice,
+            'age': current_date.year - birth_date.year - ((current_date.month, current_date.day) < (birth_date.month, birth_date.day))}
+
+def get_staticValues(StaticDataFileName):
+    # self.value... assignments of a static file, parsed once per version of the file and kept in the static cache file
+    global static_info_cache
+    if static_info_cache is None:
+        static_info_cache = load_staticCache()
+    
+    file_stat = os.stat(StaticDataFileName)
+    cache_key = os.path.abspath(StaticDataFileName)
+    cached = static_info_cache.get(cache_key)
+    if cached and cached['mtime'] == file_stat.st_mtime_ns and cached['size'] == file_stat.st_size:
+        return cached['values']
+    
+    with open(StaticDataFileName) as f:
+        static_values = parse_staticText(f.read())
+    static_info_cache[cache_key] = {'mtime': file_stat.st_mtime_ns, 'size': file_stat.st_size, 'values': static_values}
+    save_staticCache(static_info_cache)
+    return static_values
+
+def parse_staticText(text):
+    # read the self.value... = <constant> lines without running the file, so its imports and any other code never run
+    static_values = {}
+    for node in ast.walk(ast.parse(text)):
+        if not isinstance(node, ast.Assign):
+            continue
+        for target in node.targets:
+            if isinstance(target, ast.Attribute) and isinstance(target.value, ast.Name) and target.value.id == 'self' and target.attr.startswith('value'):
+                try:
+                    static_values[target.attr] = ast.literal_eval(node.value)
+                except (ValueError, TypeError):
+                    # not a plain value (e.g. a function call) - not patient info
+                    pass
+    return static_values
+
+def load_staticCache():
+    if not static_cache_file:
+        return {}
+    try:
+        with open(static_cache_file, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_staticCache(static_cache):
+    if not static_cache_file:
+        return
+    try:
+        os.makedirs(os.path.dirname(static_cache_file), exist_ok=True)
+        # write to a temporary file and swap it in, so a half written cache file is never read
+        with open(static_cache_file +'.tmp', 'w') as f:
+            json.dump(static_cache, f)
+        os.replace(static_cache_file +'.tmp', static_cache_file)
+    except (OSError, TypeError, ValueError) as e:
+        print(f'Static file cache could not be written: {e}')
 
 class PatientStudyInfo_Page(tk.Frame):
 
@@ -222,8 +373,11 @@ class PatientStudyInfo_Page(tk.Frame):
         global patient_directory
         patient_directory = f'{self.selected_folder}/**/*.gcd*'
         
-        # Get patient info from python file in folder
-        [pid, fne, brt, dte, wat, age] = get_PatientInfo_fromPyfile(self.selected_folder, self)
+        # Get patient info from python file in folder - defaults are shown until it has been read
+        set_PatientInfo(get_defaultPatientInfo())
+        self.patient_info = start_PatientInfoLookup(self.selected_folder)
+        self.patient_info_poll = None
+        self.patient_info_shown = False
     
     def build_PatientInfoUI(self):
         # --------------------------- Master Frame ------------------------------------
@@ -360,6 +514,33 @@ class PatientStudyInfo_Page(tk.Frame):
         for nchild in range(0,9):
             reportplot_info_frame.grid_rowconfigure(nchild, weight=1)
             reportplot_info_frame.grid_columnconfigure(nchild, weight=1)  
+        
+        # wait for the static python file without blocking the window
+        if self.patient_info_poll:
+            self.after_cancel(self.patient_info_poll)
+        self.poll_PatientInfo()
+    
+    def poll_PatientInfo(self):
+        global age
+        # only filled in once, after that the entries keep what is typed in
+        if self.patient_info_shown:
+            return
+        if not self.patient_info.done():
+            self.patient_info_poll = self.after(100, self.poll_PatientInfo)
+            return
+        self.patient_info_poll = None
+        self.patient_info_shown = True
+        static_info = self.patient_info.result()
+        
+        # fill in the fields that still show the defaults
+        default_info = get_defaultPatientInfo()
+        patient_fields = ((pid, MRN_entry), (fne, firstlastname_entry), (brt, brace_type_combobox), (dte, date_entry), (wat, walkaid_type_combobox))
+        for (patient_field, widget), default_value, static_value in zip(patient_fields, default_info, static_info):
+            if patient_field[0] == default_value[0] and widget.get() == default_value[0]:
+                patient_field[0] = static_value[0]
+                widget.delete(0, 'end')
+                widget.insert(0, static_value[0])
+        age = static_info[5]
             
 class SelectData_Page(tk.Frame):
 
@@ -385,23 +566,37 @@ class SelectData_Page(tk.Frame):
         exit_button = tk.Button(navigation_frame,text="Close Window", command=lambda: [self.parent.destroy()])        
         exit_button.grid(row=1, column=0, columnspan=2, sticky='nsew', padx=3, pady=5)
         
+        # Page preview frame - thumbnails of the pages saved to the pdf, scrolls when the report gets long
+        preview_frame = tk.LabelFrame(self, text='Report Pages')
+        preview_frame.grid(row=0, column=2, rowspan=100, sticky='nsew', padx=5, pady=5)
+        self.preview_canvas = tk.Canvas(preview_frame, width=140, highlightthickness=0)
+        preview_scroll = tk.Scrollbar(preview_frame, orient='vertical', command=self.preview_canvas.yview)
+        self.preview_canvas.configure(yscrollcommand=preview_scroll.set)
+        self.preview_canvas.grid(row=0, column=0, sticky='nsew')
+        preview_scroll.grid(row=0, column=1, sticky='ns')
+        preview_frame.grid_rowconfigure(0, weight=1)
+        self.preview_strip = tk.Frame(self.preview_canvas)
+        self.preview_canvas.create_window((0,0), window=self.preview_strip, anchor='nw')
+        self.preview_strip.bind('<Configure>', lambda event: self.preview_canvas.configure(scrollregion=self.preview_canvas.bbox('all')))
+        self.preview_images = []
+        
         # Plot frame
         plot_frame = tk.LabelFrame(self, text='Plot Options for Selected Files')
         plot_frame.grid(row=0, column=1, sticky='nsew', padx=5, pady=5)
         
-        button_plotKMT = tk.Button(plot_frame, text="Kinematics", command=lambda: [plot_kinematics(self), plot_FootModel(self)])
+        button_plotKMT = tk.Button(plot_frame, text="Kinematics", command=lambda: [plot_report(self, 'kinematics')])
         button_plotKMT.grid(row=0, column=0, sticky='nsew', padx=3, pady=3)
-        button_plotSaK = tk.Button(plot_frame, text="Kinetics", command=lambda: [plot_sagittalKinetics(self), plot_coronalKinetics(self)])
+        button_plotSaK = tk.Button(plot_frame, text="Kinetics", command=lambda: [plot_report(self, 'kinetics')])
         button_plotSaK.grid(row=0, column=1, sticky='nsew', padx=3, pady=3)
-        button_plotEMG = tk.Button(plot_frame, text="EMG", command=lambda: [plot_EMG(self)])
+        button_plotEMG = tk.Button(plot_frame, text="EMG", command=lambda: [plot_report(self, 'emg')])
         button_plotEMG.grid(row=0, column=2, sticky='nsew', padx=3, pady=3)
-        button_plotKKB= tk.Button(plot_frame, text="Kinematics\n& Kinetics", command=lambda: [plot_kinematics(self), plot_sagittalKinetics(self), plot_coronalKinetics(self), plot_FootModel(self)])
+        button_plotKKB= tk.Button(plot_frame, text="Kinematics\n& Kinetics", command=lambda: [plot_report(self, 'kinematics-kinetics')])
         button_plotKKB.grid(row=1, column=0, sticky='nsew', padx=3, pady=3)
-        button_plotBas = tk.Button(plot_frame, text="Basic Report\n(no EMG)", command=lambda: [plot_kinematics(self), plot_sagittalKinetics(self), plot_coronalKinetics(self), plot_MuscleLengthVel(self), plot_SpatioTemporal(self), plot_FootModel(self)])
+        button_plotBas = tk.Button(plot_frame, text="Basic Report\n(no EMG)", command=lambda: [plot_report(self, 'basic')])
         button_plotBas.grid(row=1, column=1, sticky='nsew', padx=3, pady=3)
-        button_plotALL = tk.Button(plot_frame, text="Full Report\n(with EMG)", command=lambda: [plot_kinematics(self), plot_sagittalKinetics(self), plot_coronalKinetics(self), plot_MuscleLengthVel(self), plot_EMG(self), plot_SpatioTemporal(self), plot_FootModel(self)])
+        button_plotALL = tk.Button(plot_frame, text="Full Report\n(with EMG)", command=lambda: [plot_report(self, 'full')])
         button_plotALL.grid(row=1, column=2, sticky='nsew', padx=3, pady=3)
-        button_plotSPt = tk.Button(plot_frame, text="Spatiotemporal", command=lambda: [plot_NewSpatioTemporal(self)])
+        button_plotSPt = tk.Button(plot_frame, text="Spatiotemporal", command=lambda: [plot_report(self, 'spatiotemporal')])
         button_plotSPt.grid(row=0, column=3, rowspan=2, sticky='nsew', padx=3, pady=3)
         
         # get current combobox selections and set to current
@@ -421,27 +616,24 @@ class SelectData_Page(tk.Frame):
         vst[0] = vstused_get
         
         # global patient_directory
-        self.selected_files = []
-        selected_patient_folders = []
         # Pull all files within the folder and subfolders with .gcd file extension
-        for file in glob.glob(patient_directory, recursive=True, include_hidden=True):
-            self.selected_files.append(file.lower())
-            folder = file.split("\\")[-2]
-            if folder not in selected_patient_folders:
-                selected_patient_folders.append(folder)
-            
-        global folderfile_name
-        folderfile_name = []
-        for name in self.selected_files:
-            filename = name.replace('/','\\')
-            folderfile_name.append(os.path.split(filename))
+        # each file goes in the trial registry once, grouped by session folder in the order they are found
+        patient_folder = patient_directory.split('/**')[0]
+        trial_registry.clear()
+        clear_trialPrefetch()
+        session_trials = {}
+        for file, file_stat in scan_gcdFolders(patient_folder):
+            trial_id = register_trial(file, patient_folder, file_stat)
+            session_trials.setdefault(trial_registry[trial_id]['session'], []).append(trial_id)
         
         rowidx = 1
         # global checkboxes
         self.checkboxes = {}
+        self.trial_checkbuttons = {}
+        self.shown_status = {}
         
         # reverse order of patient folders so most recent comes first
-        ordered_patient_folders = selected_patient_folders[::-1]
+        ordered_patient_folders = list(session_trials)[::-1]
         
         for curr_session in ordered_patient_folders:
             selectLeft_file_frame = tk.LabelFrame(self, text=f'Select Left {curr_session} files')
@@ -452,19 +644,22 @@ class SelectData_Page(tk.Frame):
             rowidx += 1
         
             # get file names and print to checkboxes on select file frame
-            for num in range(0,len(self.selected_files)):
-                folder_forFile = self.selected_files[num].split("\\")[-2]
-                if folder_forFile == curr_session.lower():
-                    gcdfile = os.path.basename(self.selected_files[num])
-                    Lvar = StringVar()
-                    filenameLeft_checkbox = tk.Checkbutton(selectLeft_file_frame, text=gcdfile, variable=Lvar, onvalue=gcdfile, offvalue="")
-                    filenameLeft_checkbox.grid(row=num, column=0, sticky='w')
-                    # filenameLeft_checkbox.select()                                        Uncommenting this line of code will automatically pre-select all files
-                    Rvar = StringVar()
-                    filenameRight_checkbox = tk.Checkbutton(selectRight_file_frame, text=gcdfile, variable=Rvar, onvalue=gcdfile, offvalue="")
-                    filenameRight_checkbox.grid(row=num, column=1, sticky='w')
-                    # filenameRight_checkbox.select()                                        Uncommenting this line of code will automatically pre-select all files
-                    self.checkboxes.update({gcdfile+'L': Lvar, gcdfile+'R': Rvar})
+            for num, trial_id in enumerate(session_trials[curr_session]):
+                gcdfile = trial_registry[trial_id]['name']
+                Lvar = StringVar()
+                filenameLeft_checkbox = tk.Checkbutton(selectLeft_file_frame, text=gcdfile, variable=Lvar, onvalue=gcdfile, offvalue="")
+                filenameLeft_checkbox.grid(row=num, column=0, sticky='w')
+                # filenameLeft_checkbox.select()                                        Uncommenting this line of code will automatically pre-select all files
+                Rvar = StringVar()
+                filenameRight_checkbox = tk.Checkbutton(selectRight_file_frame, text=gcdfile, variable=Rvar, onvalue=gcdfile, offvalue="")
+                filenameRight_checkbox.grid(row=num, column=1, sticky='w')
+                # filenameRight_checkbox.select()                                        Uncommenting this line of code will automatically pre-select all files
+                self.checkboxes.update({trial_id+'L': Lvar, trial_id+'R': Rvar})
+                self.trial_checkbuttons[trial_id] = (filenameLeft_checkbox, filenameRight_checkbox)
+                
+                # start loading the file in the background when either limb is ticked
+                Lvar.trace_add('write', lambda *args, trial_id=trial_id: self.select_trial(trial_id))
+                Rvar.trace_add('write', lambda *args, trial_id=trial_id: self.select_trial(trial_id))
                 
         # pack and scale size of widgets after information has been printed to frames
         for widget in plot_frame.winfo_children():
@@ -483,6 +678,51 @@ class SelectData_Page(tk.Frame):
         # main frame widget packing
         for widget in self.winfo_children():
             widget.grid_configure(padx=3, pady=3)
+        
+        # one status poll running per page, rebuilding the page restarts it
+        if getattr(self, 'prefetch_poll', None):
+            self.after_cancel(self.prefetch_poll)
+        self.poll_prefetchStatus()
+
+    def select_trial(self, trial_id):
+        # ticking either limb queues the file to load in the background, unticking both cancels it
+        if self.checkboxes[trial_id+'L'].get() or self.checkboxes[trial_id+'R'].get():
+            queue_trialPrefetch(trial_id)
+        else:
+            cancel_trialPrefetch(trial_id)
+    
+    def poll_prefetchStatus(self):
+        # checkbox text colour shows the load state - the load threads never touch tk, the page checks on them
+        with trial_cache_lock:
+            current_status = dict(prefetch_status)
+        for trial_id, checkbuttons in self.trial_checkbuttons.items():
+            trial_state = current_status.get(trial_id)
+            if self.shown_status.get(trial_id) != trial_state:
+                for checkbutton in checkbuttons:
+                    checkbutton.configure(fg=prefetch_colors.get(trial_state, 'black'))
+                self.shown_status[trial_id] = trial_state
+        self.prefetch_poll = self.after(250, self.poll_prefetchStatus)
+
+    def add_pagePreview(self, fig, bookmark_name):
+        # render the page small to png and add it to the thumbnail strip
+        png_buffer = io.BytesIO()
+        fig.savefig(png_buffer, format='png', dpi=page_preview_dpi)
+        page_image = tk.PhotoImage(data=base64.b64encode(png_buffer.getvalue()))
+        thumb_image = page_image.subsample(6)
+        self.preview_images.append((page_image, thumb_image))
+        
+        thumb_button = tk.Button(self.preview_strip, image=thumb_image, text=bookmark_name, compound='top', 
+                                 command=lambda: self.show_pagePreview(page_image, bookmark_name))
+        thumb_button.grid(row=len(self.preview_images), column=0, padx=3, pady=3)
+        
+        # redraw the strip now rather than when the whole report is done
+        self.update_idletasks()
+        self.preview_canvas.yview_moveto(1.0)
+        
+    def show_pagePreview(self, page_image, bookmark_name):
+        preview_window = tk.Toplevel(self)
+        preview_window.title(bookmark_name)
+        tk.Label(preview_window, image=page_image).pack()
 
 def clear_bookmarks():
     global bookmarks
@@ -490,40 +730,249 @@ def clear_bookmarks():
     
     bookmarks = []
     marknum = 0
+    
+    # new report session, trials will be parsed again on first use
+    clear_trialCache()
 
 ### ------------------ Data Retrieval -----------------------------------------
-def get_gcdData(gcd_file, folderfile_name):
+def get_gcdData(gcd_file, folderfile_name, file_stat=None):
+    gcd_path = os.path.join(folderfile_name, gcd_file)
+    
+    # ----------------------------- Get cached data -----------------------
+    # use the binary cache file when it was written from this exact version of the gcd file
+    if gcd_cache_folder:
+        if file_stat is None:
+            file_stat = os.stat(gcd_path)
+        data_dict = load_gcdSidecar(gcd_path, file_stat)
+        if data_dict is not None:
+            return data_dict
+    
     # ----------------------------- Get data ------------------------------
-        f = open(folderfile_name +'\\' +gcd_file, 'r+')
-        data = f.readlines()
+    with open(gcd_path, 'r') as f:
+        data = f.read()
+    data_dict = parse_gcdText(data)
+    
+    if gcd_cache_folder:
+        save_gcdSidecar(gcd_path, file_stat, data_dict)
+    return data_dict
+
+def get_gcdSidecarPaths(gcd_path):
+    # cache files are named from the full gcd path so files with the same name in different sessions do not collide
+    source = os.path.abspath(gcd_path)
+    name = hashlib.sha1(source.lower().encode('utf-8')).hexdigest()
+    return source, os.path.join(gcd_cache_folder, name +'.npy'), os.path.join(gcd_cache_folder, name +'.json')
+
+def load_gcdSidecar(gcd_path, file_stat):
+    source, data_path, index_path = get_gcdSidecarPaths(gcd_path)
+    try:
+        with open(index_path, 'r') as f:
+            index = json.load(f)
+        
+        # stale if the gcd file was modified or replaced after the cache file was written
+        if index['source'] != source or index['mtime'] != file_stat.st_mtime_ns or index['size'] != file_stat.st_size:
+            return None
+        
+        # all channels are stored back to back in one array, memory mapped so only the channels that are plotted get read
+        values = np.load(data_path, mmap_mode='r')
+    except (OSError, ValueError, KeyError):
+        return None
+    
+    return {key: values[start:stop] for key, start, stop in index['channels']}
+
+def save_gcdSidecar(gcd_path, file_stat, data_dict):
+    source, data_path, index_path = get_gcdSidecarPaths(gcd_path)
+    
+    # index of channel names and where each channel starts and stops in the stored array
+    channels = []
+    start = 0
+    for key, values in data_dict.items():
+        channels.append([key, start, start +len(values)])
+        start += len(values)
+    index = {'source': source, 'mtime': file_stat.st_mtime_ns, 'size': file_stat.st_size, 'channels': channels}
+    
+    try:
+        os.makedirs(gcd_cache_folder, exist_ok=True)
+        # write to temporary files and swap them in, data before index, so a half written cache file is never used
+        with open(data_path +'.tmp', 'wb') as f:
+            np.save(f, np.concatenate(list(data_dict.values())) if data_dict else np.array([], dtype=np.float64))
+        os.replace(data_path +'.tmp', data_path)
+        
+        with open(index_path +'.tmp', 'w') as f:
+            json.dump(index, f)
+        os.replace(index_path +'.tmp', index_path)
+    except OSError as e:
+        print(f'GCD cache file for {os.path.basename(gcd_path)} could not be written: {e}')
+
+def scan_gcdFolders(patient_folder):
+    # all gcd files in the patient folder and its subfolders with their file stats, folders in name order
+    gcd_files = []
+    folder_list = [os.path.abspath(patient_folder)]
+    while folder_list:
+        folder_files, subfolders = get_folderListing(folder_list.pop())
+        gcd_files.extend(folder_files)
+        folder_list.extend(subfolders[::-1]) # popped from the end, so first subfolder is scanned next
+    return gcd_files
+
+def get_folderListing(folder):
+    # one os.scandir per folder, kept until files are added, removed or renamed in the folder (that changes its mtime)
+    # file stats come with the listing on Windows, so the network share is not asked about every gcd file
+    folder_mtime = os.stat(folder).st_mtime_ns
+    if folder in folder_listings and folder_listings[folder][0] == folder_mtime:
+        return folder_listings[folder][1:]
+    
+    folder_files = []
+    subfolders = []
+    with os.scandir(folder) as folder_entries:
+        for entry in sorted(folder_entries, key=lambda entry: entry.name.lower()):
+            if entry.is_dir():
+                subfolders.append(entry.path)
+            elif '.gcd' in entry.name.lower() and entry.is_file():
+                folder_files.append((entry.path, entry.stat()))
+    
+    folder_listings[folder] = (folder_mtime, folder_files, subfolders)
+    return folder_files, subfolders
+
+def register_trial(trial_path, patient_folder, file_stat=None):
+    # trial id is the file path below the patient folder, so files with the same name in different sessions are kept apart
+    trial_path = os.path.abspath(trial_path)
+    trial_id = os.path.relpath(trial_path, patient_folder).replace('\\','/').lower()
+    if file_stat is None:
+        file_stat = os.stat(trial_path)
+    trial_registry[trial_id] = {'path':     trial_path,
+                                'folder':   os.path.dirname(trial_path),
+                                'session':  os.path.basename(os.path.dirname(trial_path)),
+                                'name':     os.path.basename(trial_path),
+                                'size':     file_stat.st_size,
+                                'mtime_ns': file_stat.st_mtime_ns}
+    return trial_id
+
+def get_cachedTrial(gcd_file, folderfile_name):
+    # parse each gcd file once per report session and share it with every page builder
+    # the file is stat'ed each time so a trial re-processed in Nexus during the session is parsed again
+    file_path = os.path.abspath(os.path.join(folderfile_name, gcd_file))
+    file_stat = os.stat(file_path)
+    trial_key = (file_path, file_stat.st_mtime_ns, file_stat.st_size)
+    
+    # only one thread parses a trial - plotting waits for a background load of the same file instead of reading it again
+    with trial_cache_lock:
+        if trial_key in trial_cache:
+            trial_cache_stats['hits'] += 1
+            return trial_cache[trial_key]
+        
+        trial_loaded = trial_loading.get(trial_key)
+        is_loader = trial_loaded is None
+        if is_loader:
+            trial_loaded = trial_loading[trial_key] = threading.Event()
+            trial_cache_stats['misses'] += 1
+    
+    if not is_loader:
+        # look again once the other thread is done, if it failed this thread parses the file (and reports the error)
+        trial_loaded.wait()
+        return get_cachedTrial(gcd_file, folderfile_name)
+    
+    try:
+        data_dict = get_gcdData(gcd_file, folderfile_name, file_stat)
+        with trial_cache_lock:
+            trial_cache[trial_key] = data_dict
+    finally:
+        with trial_cache_lock:
+            del trial_loading[trial_key]
+        trial_loaded.set()
+    return data_dict
+
+def clear_trialCache():
+    with trial_cache_lock:
+        trial_cache.clear()
+        trial_cache_stats['hits'] = 0
+        trial_cache_stats['misses'] = 0
+    
+def log_trialCache():
+    print(f"Trial cache: {trial_cache_stats['hits']} hits, {trial_cache_stats['misses']} misses, {len(trial_cache)} trials loaded")
+
+def queue_trialPrefetch(trial_id):
+    # load a ticked trial into the trial cache in the background, so it is ready when a plot button is pressed
+    global prefetch_queue
+    if prefetch_workers < 1:
+        return
+    if prefetch_queue is None:
+        prefetch_queue = queue.Queue(maxsize=prefetch_queue_size)
+        for num in range(prefetch_workers):
+            threading.Thread(target=run_trialPrefetch, name=f'trial prefetch {num}', daemon=True).start()
+    
+    with trial_cache_lock:
+        if trial_id in prefetch_wanted:
+            return
+        prefetch_wanted.add(trial_id)
+        prefetch_status[trial_id] = 'queued'
+    
+    try:
+        # registry entry goes with the trial id, the registry is rebuilt when the page is
+        prefetch_queue.put_nowait((trial_id, trial_registry[trial_id]))
+    except queue.Full:
+        # too many waiting, this one is loaded when plotting
+        cancel_trialPrefetch(trial_id)
+
+def cancel_trialPrefetch(trial_id):
+    # unticked - the load thread skips the trial when it comes off the queue
+    with trial_cache_lock:
+        prefetch_wanted.discard(trial_id)
+        prefetch_status.pop(trial_id, None)
+
+def clear_trialPrefetch():
+    with trial_cache_lock:
+        prefetch_wanted.clear()
+        prefetch_status.clear()
+
+def run_trialPrefetch():
+    # load thread, runs for the life of the program
+    while True:
+        trial_id, trial = prefetch_queue.get()
+        with trial_cache_lock:
+            if trial_id not in prefetch_wanted:
+                continue
+            prefetch_status[trial_id] = 'loading'
+        
+        try:
+            get_cachedTrial(trial['name'], trial['folder'])
+            trial_state = 'loaded'
+        except Exception as e:
+            print(f"{trial['name']} could not be loaded in the background: {e}")
+            trial_state = 'failed'
+        
+        with trial_cache_lock:
+            if trial_id in prefetch_wanted:
+                prefetch_status[trial_id] = trial_state
+
+def parse_gcdText(data):
     # ---------------------------- Get headers ----------------------------
-        # find index of data headers that start with "!"
-        headerIndex = [i for i, e in enumerate(data) if e[0] == "!"]
-       
+    # split the file text at every data header that starts with "!" in one pass
+    # each block is then the header key on its first line followed by the values for that key
+    blocks = re.split(r'^!', data, flags=re.M)
+
     # ----------------------------- Convert data --------------------------
-        data_dict ={}
-        for num in list(range(0,len(headerIndex))):
-            # pull keys and asign to temporary variable
-            key = data[headerIndex[num]][1:-1]
-            # pull data associated with given key, minus "\n" and convert to float
+    data_dict = {}
+    # first block is anything above the first header and holds no data
+    for block in blocks[1:]:
+        # pull keys and asign to temporary variable
+        key, _, val = block.partition('\n')
+        # add key:value pairs to dictionary
+        data_dict[key] = parse_gcdBlock(val)
+    return data_dict
+
+def parse_gcdBlock(val):
+    # convert all values of a data block to a float64 array in one call
+    try:
+        return np.array(val.split(), dtype=np.float64)
+    except ValueError:
+        # block contains a line that is not a number - convert line by line and skip those lines
+        values = []
+        for i in val.splitlines():
             try:
-                # get all values of data for key associated with headerIndex[num] up to next headerIndex[num+1]
-                val = data[headerIndex[num]+1:headerIndex[num+1]]
-            except:
-                # same as above but for the reamining set of data for the last key
-                val = data[headerIndex[num]+1:]
-                    
-            # convert values to float
-            values = []
-            for i in val:
-                try:
-                    values.append(float(i))    
-                except:
-                    continue
-            # add key:value pairs to dictionary
-            data_dict.update({key: values})
-        return data_dict  
-    
+                values.append(float(i))
+            except ValueError:
+                continue
+        return np.array(values, dtype=np.float64)
+
 def get_normData(normfolderfile_name, isEMG, self):
     # 'age' is a global variable either calculated or set to '1' if static file is not available
     if age > 2 and age < 8:
@@ -544,41 +993,81 @@ def get_normData(normfolderfile_name, isEMG, self):
     else:
         normFile = normFile
     
-    normFile_path = os.path.join(normfolderfile_name, normFile)
-    f = open(normFile_path, 'r+')
-    dataN = f.readlines()
-    headerIndexN = [i for i, e in enumerate(dataN) if e[0] == "!"]
+    norm = get_normStore(normfolderfile_name, normFile)
+    return norm['mean'], norm['std'], normFile
+
+def get_normStore(normfolderfile_name, normFile):
+    # each norm age band is read and parsed only the first time it is asked for
+    if normFile not in norm_store:
+        normFile_path = os.path.join(normfolderfile_name, normFile)
+        with open(normFile_path, 'r') as f:
+            dataN = f.read()
+        norm_store[normFile] = parse_normText(dataN)
+    return norm_store[normFile]
+
+def parse_normText(dataN):
     dataNmean_dict = {}
     dataNstd_dict = {}
+    dataNlower_dict = {}
+    dataNupper_dict = {}
     
-    for num in list(range(0,len(headerIndexN))):
-        # pull keys and asign to temporary variable
-        keyN = dataN[headerIndexN[num]].split()[0][1:]
-        # pull data associated with given key, minus "\n" and number of subjects used, then convert to float
-        try:
-            # get all values of data for key associated with headerIndex[num] up to next headerIndex[num+1]
-            valN = dataN[headerIndexN[num]+1:headerIndexN[num+1]]
-        except:
-            # same as above but for the reamining set of data for the last key
-            valN = dataN[headerIndexN[num]+1:]
-        # convert values to float
-        meanN = []
-        sdN = []
-        for i in valN:
-            # most variables have MEAN and SD data, but some only have a single value
-            try:
-                meanN.append(float(i.split()[0]))  
-                sdN.append(float(i.split()[1]))
-            except:
-                meanN.append(float(i))
-                
+    # split at the "!" data headers, header line holds the key and the number of subjects used
+    for block in re.split(r'^!', dataN, flags=re.M)[1:]:
+        header, _, valN = block.partition('\n')
+        keyN = (header.split() or [''])[0]
+        meanN, sdN = parse_normBlock(valN)
+        
         # add key:value pairs to dictionary
-        dataNmean_dict.update({keyN: meanN})
-        dataNstd_dict.update({keyN: sdN})
-    return dataNmean_dict, dataNstd_dict, normFile
+        dataNmean_dict[keyN] = meanN
+        dataNstd_dict[keyN] = sdN
+        
+        # precompute mean +/- 1SD bands for variables that have SD data
+        if len(sdN) == len(meanN):
+            dataNlower_dict[keyN] = meanN - sdN
+            dataNupper_dict[keyN] = meanN + sdN
+    
+    return {'mean': dataNmean_dict, 'std': dataNstd_dict, 
+            'lower': dataNlower_dict, 'upper': dataNupper_dict}
+
+def parse_normBlock(valN):
+    # most variables have MEAN and SD data on each line, but some only have a single value
+    rows = [i for i in valN.splitlines() if i.strip()]
+    try:
+        values = np.array(valN.split(), dtype=np.float64)
+        if rows and len(values) == 2*len(rows):
+            return values[0::2], values[1::2]
+        elif len(values) == len(rows):
+            return values, np.array([], dtype=np.float64)
+    except ValueError:
+        pass
+    
+    # mixed or damaged block - convert line by line
+    meanN = []
+    sdN = []
+    for i in rows:
+        try:
+            row = i.split()
+            meanN.append(float(row[0]))
+            if len(row) > 1:
+                sdN.append(float(row[1]))
+        except ValueError:
+            continue
+    return np.array(meanN, dtype=np.float64), np.array(sdN, dtype=np.float64)
         
 # saving entry data
 def save_entries():
+    set_reportInfo(firstlastname_entry.get(), MRN_entry.get(), Dx_type_combobox.get(), date_entry.get(),
+                   visit_type_combobox.get(), condition_type_combobox.get(), brace_type_combobox.get(),
+                   walkaid_type_combobox.get(), report_type_combobox.get(), VSTused_type_combobox.get())
+    
+    try:
+        save_path = patient_directory.split("/")
+        open_pdf('/'.join(save_path[0:4]))
+    except: 
+        tk.messagebox.showerror('Python Error', 'ERROR: \n\nIt appears that the filename you are trying to use already exists and is open in another program. \n\nClose the file and retry, or change patient info to continue.')
+        quit()
+
+def set_reportInfo(name, mrn, dx, study_date, visit_type, condition_type, brace_type, walkaid_type, report_type, vst_used):
     global PatientName
     global MRN
     global diagnosis
@@ -588,99 +1077,197 @@ def save_entries():
     global brace
     global walkaid
     global report
-    global pdffile
     global VSTmodelused
     
-    PatientName = firstlastname_entry.get()
+    PatientName = name
     fne[0] = PatientName
-    MRN = (MRN_entry.get() +'_')                            # adds underscore for file naming convention
+    MRN = (mrn +'_')                                        # adds underscore for file naming convention
     pid[0] = MRN[0:-1]                                      # Save entered name for use in another report
-    diagnosis = Dx_type_combobox.get()
-    studydate = date_entry.get()
+    diagnosis = dx
+    studydate = study_date
     dte[0] = studydate
-    visit = visit_type_combobox.get()
-    condition = (condition_type_combobox.get() +'_')
-    brace = brace_type_combobox.get()
-    walkaid = walkaid_type_combobox.get()
-    report = (report_type_combobox.get() +'_')
-    VSTmodelused = VSTused_type_combobox.get()
+    visit = visit_type
+    condition = (condition_type +'_')
+    brace = brace_type
+    walkaid = walkaid_type
+    report = (report_type +'_')
+    VSTmodelused = vst_used
+
+def open_pdf(output_folder):
+    global pdffile
+    global pdf_folder
     
-    try:
-        save_path = patient_directory.split("/")
-        filename = f'{condition +MRN +report +studydate}.pdf'
-        filenamepath =  os.path.join('/'.join(save_path[0:4]), filename)
-        pdffile = PdfPages(filenamepath)
-    except: 
-        tk.messagebox.showerror('Python Error', 'ERROR: \n\nIt appears that the filename you are trying to use already exists and is open in another program. \n\nClose the file and retry, or change patient info to continue.')
-        quit()
+    pdf_folder = output_folder
+    from matplotlib.backends.backend_pdf import PdfPages
+    pdffile = PdfPages(get_pdfPath())
+
+def get_pdfPath():
+    filename = f'{condition +MRN +report +studydate}.pdf'
+    return os.path.join(pdf_folder, filename)
     
 def close_pdf(self):
     try:
-        # this will close the already completed pdf file that does not have the bookmarks
-        pdffile.close()
-        
-        # write headers to pdf file
-        save_path = patient_directory.split("/")
-        filename = f'{condition +MRN +report +studydate}.pdf'
-        output_path = os.path.join('/'.join(save_path[0:4]), filename)
-        
-        # this will open the pdf file and read that pages and add bookmarks from the bookmarks list
-        pdf_reader = PyPDF2.PdfReader(output_path)
-        pdf_writer = PyPDF2.PdfWriter()
-        for numpage in range(0,len(bookmarks)):
-            page = pdf_reader.pages[numpage]
-            pdf_writer.add_page(page)
-            pdf_writer.add_outline_item(bookmarks[numpage][0], bookmarks[numpage][1])
-            
-        with open (output_path, 'wb') as output_file:
-            pdf_writer.write(output_file)
-        
-        output_file.close()
+        write_pdf()
         tk.messagebox.showinfo("PDF file has been saved", "Go back and pick files for a new report or close the window.")
        
         # Text file export
         if not MRN == '1234567':
             try:
-                # get the current date
-                date_today = date.today().strftime('%m-%d-%Y')
-                
-                # specify file path where saved file will go
-                # save_path = patient_directory.split("/")
-                file_path = os.path.join('/'.join(save_path[0:4]),f'{PatientName}_{MRN}_ProcessingLog.txt')
-                
-                # open the file in append mode ('a')
-                with open(file_path, 'a') as f:
-                    # check if the file exists
-                    if os.path.getsize(file_path) == 0:
-                        # write each variable to the file
-                        f.write('PATIENT INFO \n')
-                        f.write(f'{PatientName} \n')
-                        f.write(f'{MRN} \n')
-                        f.write(f'{diagnosis} \n')
-                        f.write(f'File created on: {date_today} \n\n\n')
-                    
-                    f.write(f'REPORT GENERATION LOG CREATED ON: {date_today} \n')
-                    f.write(f'Study date: {studydate} \n')
-                    f.write(f'Visit Type: {visit} \n')
-                    f.write(f'Condition: {condition} \n')
-                    f.write(f'Brace Type: {brace} \n')
-                    f.write(f'Walk Aide Type: {walkaid} \n')
-                    f.write(f'Report Type Generated: {report} \n')
-                    f.write(f'VST Model Used: {VSTmodelused} \n\n')
-                    f.write('Files included in report: \n')
-                    
-                    for file in self.checkboxes:
-                        # If the variable is set
-                        if self.checkboxes[file].get():
-                            f.write(str(f'{file}' + '\n'))
-                    
-                    f.write(f'END OF REPORT LOG FOR: {date_today} \n\n\n')
+                write_processingLog(self)
             except: 
                 tk.messagebox.showerror('Python Error', 'ERROR: \n\nIt appears that the text filename you are trying to use already exists and is open in another program. \n\nClose the file and retry, or change patient info to continue.')
     except:
         print('Window closed, no data to save')
+
+def write_pdf():
+    # pages are already in the pdf file - add the bookmarks and close it, so the file is only written once
+    pdf_file = get_pdfFile()
+    if pdf_file is not None and is_pdfOutlineSupported():
+        try:
+            write_pdfOutline(pdf_file)
+        except Exception as e:
+            print(f'PDF bookmarks could not be added ({e}), the report is saved without them')
+    pdffile.close()
+    log_trialCache()
+    return get_pdfPath()
+
+# the bookmarks are written with private parts of matplotlib's pdf backend (PdfPages._file, a PdfFile, and its
+# pageList, reserveObject, writeObject, rootObject, pagesObject and fh). These were written against the matplotlib
+# 3.5 to 3.10 source - for other versions the pdf is saved without bookmarks rather than risk a broken file
+pdf_outline_versions = ((3, 5), (3, 10))
+pdf_file_parts       = ('pageList', 'reserveObject', 'writeObject', 'rootObject', 'pagesObject', 'fh')
+
+def get_pdfFile():
+    # the matplotlib PdfFile behind PdfPages - None before the first page is saved, or if it is not laid out as expected
+    pdf_file = getattr(pdffile, '_file', None)
+    if pdf_file is None or not all(hasattr(pdf_file, part) for part in pdf_file_parts):
+        return None
+    return pdf_file
+
+def is_pdfOutlineSupported():
+    import matplotlib
+    mpl_version = tuple(int(part) for part in re.findall(r'\d+', matplotlib.__version__)[:2])
+    if pdf_outline_versions[0] <= mpl_version <= pdf_outline_versions[1]:
+        return True
+    print(f'PDF bookmarks are not added with matplotlib {matplotlib.__version__}, only checked for '
+          f'{pdf_outline_versions[0][0]}.{pdf_outline_versions[0][1]} to {pdf_outline_versions[1][0]}.{pdf_outline_versions[1][1]}')
+    return False
+
+def write_pdfOutline(pdf_file):
+    from matplotlib.backends.backend_pdf import Name
+    # bookmark list is (bookmark name, page number), one outline item per bookmark in the same order
+    outline_marks = [mark for mark in bookmarks if mark[1] < len(pdf_file.pageList)]
+    if not outline_marks:
+        return
+    
+    outlineObject = pdf_file.reserveObject('outlines')
+    itemObjects = [pdf_file.reserveObject('outline item') for mark in outline_marks]
+    for num, (bookmark_name, page_num) in enumerate(outline_marks):
+        item = {'Title': bookmark_name,
+                'Parent': outlineObject,
+                'Dest': [pdf_file.pageList[page_num], Name('Fit')]}
+        if num > 0:
+            item['Prev'] = itemObjects[num-1]
+        if num < len(itemObjects)-1:
+            item['Next'] = itemObjects[num+1]
+        pdf_file.writeObject(itemObjects[num], item)
+    
+    pdf_file.writeObject(outlineObject, {'Type': Name('Outlines'), 
+                                         'First': itemObjects[0], 
+                                         'Last': itemObjects[-1], 
+                                         'Count': len(itemObjects)})
+    
+    # the catalog was written when the file was opened - write it again pointing to the outline
+    # the cross-reference table written on close points to this last copy, so readers open with the bookmarks shown
+    pdf_file.writeObject(pdf_file.rootObject, {'Type': Name('Catalog'), 
+                                               'Pages': pdf_file.pagesObject, 
+                                               'Outlines': outlineObject, 
+                                               'PageMode': Name('UseOutlines')})
+
+def write_processingLog(self):
+    # get the current date
+    date_today = date.today().strftime('%m-%d-%Y')
+    
+    # specify file path where saved file will go
+    file_path = os.path.join(pdf_folder,f'{PatientName}_{MRN}_ProcessingLog.txt')
+    
+    # open the file in append mode ('a')
+    with open(file_path, 'a') as f:
+        # check if the file exists
+        if os.path.getsize(file_path) == 0:
+            # write each variable to the file
+            f.write('PATIENT INFO \n')
+            f.write(f'{PatientName} \n')
+            f.write(f'{MRN} \n')
+            f.write(f'{diagnosis} \n')
+            f.write(f'File created on: {date_today} \n\n\n')
+        
+        f.write(f'REPORT GENERATION LOG CREATED ON: {date_today} \n')
+        f.write(f'Study date: {studydate} \n')
+        f.write(f'Visit Type: {visit} \n')
+        f.write(f'Condition: {condition} \n')
+        f.write(f'Brace Type: {brace} \n')
+        f.write(f'Walk Aide Type: {walkaid} \n')
+        f.write(f'Report Type Generated: {report} \n')
+        f.write(f'VST Model Used: {VSTmodelused} \n\n')
+        f.write('Files included in report: \n')
+        
+        for file in self.checkboxes:
+            # If the variable is set - logged with the trial's file name as it is on disk, plus the limb letter
+            if self.checkboxes[file].get():
+                f.write(str(f"{trial_registry[file[0:-1]]['name']}{file[-1]}" + '\n'))
+        
+        f.write(f'END OF REPORT LOG FOR: {date_today} \n\n\n')
    
 ### ------------------ Plotting functions -------------------------------------
+def save_page(self, fig, bookmark_name, page_settings=None):
+    global bookmarks
+    global marknum
+    
+    if fig is None:
+        raise ValueError(f'No {bookmark_name} page to save')
+    set_pageRaster(fig, page_settings)
+    
+    if rendered_pages is not None:
+        # page built in a render worker - the main process writes it to the pdf
+        plt.close(fig)
+        rendered_pages.append((bookmark_name, fig))
+        return
+    
+    if page_preview == 'windows':
+        # Show the plot, waits until the window is closed
+        plt.show()
+    
+    # Save plot as PDF, flushed so finished pages are on disk as they are made instead of when the pdf is saved
+    # the dpi only sets the resolution of the rasterized data layers, the rest of the page is vector
+    if getattr(fig, 'raster_dpi', 0):
+        pdffile.savefig(fig, dpi=fig.raster_dpi)
+    else:
+        pdffile.savefig(fig)
+    pdf_file = get_pdfFile()
+    if pdf_file is not None:
+        pdf_file.fh.flush()
+    bookmarks.append((bookmark_name, marknum))
+    marknum += 1
+    
+    if page_preview == 'thumbnails' and hasattr(self, 'add_pagePreview'):
+        self.add_pagePreview(fig, bookmark_name)
+    
+    # page is in the pdf, free the figure so memory does not build up over a full report
+    plt.close(fig)
+
+def set_pageRaster(fig, page_settings):
+    # lines, norm bands and other data layers are rasterized at the RasterDPI of the page type, text and axes stay vector
+    # matplotlib merges the rasterized artists of each plot into one image, so its size does not grow with the trials overlaid
+    raster_dpi = getattr(page_settings, 'RasterDPI', 0)
+    if not raster_dpi:
+        return
+    for ax in fig.get_axes():
+        for artist in [*ax.lines, *ax.collections, *ax.patches, *ax.images]:
+            artist.set_rasterized(True)
+    # kept on the figure so pages built in a render worker are saved at the same dpi
+    fig.raster_dpi = raster_dpi
+
 def plot_Data(self, plot_type, page_settings, is_EMG):
     global bookmarks
     global marknum
@@ -697,6 +1284,7 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
     LeftPlotNum = 0   # used to track left limb files to specify index into blue colormap 
     RightPlotNum = 0   # used to track right limb files to specify index into red colormap
     gcd_count = 0 # used to track total number of gcd files plotted
+    axis_lines = {} # line segments for each subplot, drawn as one LineCollection per subplot before saving
     
     # count number of gcd files selected in checkboxes
     gcdNum_selected = len([i for i in self.checkboxes if self.checkboxes[i].get()])
@@ -705,13 +1293,12 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
     for file in self.checkboxes:
         # get set variables from checkboxes
         if self.checkboxes[file].get():
-            gcd_file = file[0:-1] # pulling the "L" or "R" off the end that is assigned in checkbox selection
+            trial = trial_registry[file[0:-1]] # pulling the "L" or "R" off the end that is assigned in checkbox selection
+            gcd_file = trial['name']
             
         # ----------------------------- Get patient data ----------------------
-            # list(checkboxes).index(gcd_file) pulls the index of the gcd_file in checkboxes to reference appropriate file-path when accessing .gcd files from subfolders
-            # gcd_file will have "L" or "R" ending to specify if the file should be plotted for left or right limbs respectively
-            ffnIDX = int(list(self.checkboxes).index(gcd_file+'L')/2)
-            data_dict = get_gcdData(gcd_file, folderfile_name[::-1][ffnIDX][0])
+            # the trial registry holds the session folder for each checkbox, see register_trial
+            data_dict = get_cachedTrial(gcd_file, trial['folder'])
             
         # ----------------------------- Set up limb and loop refs -------------
             limb_spec = ['Left','Right']
@@ -767,32 +1354,13 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
                         PlotNum = RightPlotNum
                         continue
               
-        # ----------------------------- Set plot page -------------------------
-            if not fig:
-                plt.rcParams.update({
-                    'font.size': sf,
-                    'axes.titlesize': 15,
-                    'figure.titlesize': 15
-                })
-                
-                # setting up the plot page
-                fig, axes = plt.subplots(6, 3, figsize=(8.5,11))
-                fig.tight_layout()
-                plt.subplots_adjust(left=0.12, right=0.9, top=0.9, bottom=0.01)
-                
-                fig.suptitle(f"Shriners Children's - {site_name}, Motion Analysis Center", fontsize=15)
-                titlenamestr = f'{plot_type} \n' +condition[0:-1] +' ' +report[0:-1] +' Plots'
-                plt.gcf().text(0.5,0.925, titlenamestr, fontsize=sf, color='k', horizontalalignment='center')
-        
-                # Flatten the axes1 array
-                axes = axes.flatten()
-        
         # ----------------------------- Get norm data -------------------------
-            # ONLY GET and PLOT norm data once 
-            if gcd_count == 0:
+            # ONLY GET norm data once, with the plot page
+            if not fig:
                 isEMG = False
                 dataNmean_dict, dataNstd_dict, normFile = get_normData(normfolderfile_name, isEMG, self)
-        
+                norm = get_normStore(normfolderfile_name, normFile)
+
         # ----------------------------- Plot data -----------------------------
             for Lnum in plotloop:
                 n = 16 # default number of colormap vectors to use in plotting
@@ -824,20 +1392,21 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
                         continue
                         
                 # setting plotting parameters
-                x = list(range(0,datLen))
+                x = np.arange(datLen)
                 xts = int(round(datLen,-1)/5) # xtick axis spacing - rounds to 20 with 101 data points or 10 with 51 data points so x-ticks have 6 values from 0:100 or 0:50
                 scaleX = 1.0
                 if xts<20:
                     scaleX = 2
-                
-                plt.rc('font', size=sf)          # controls default text sizes
-                plt.rc('axes', titlesize=sf)     # fontsize of the axes1 title
-                plt.rc('axes', labelsize=sf)     # fontsize of the x and y labels
-                plt.rc('xtick', labelsize=xf)    # fontsize of the tick labels
-                plt.rc('ytick', labelsize=xf)    # fontsize of the tick labels
-                plt.rc('legend', fontsize=mf)    # legend fontsize
-                plt.rc('figure', titlesize=lf)   # fontsize of the figure title
-                
+
+                # ----------------- Set plot page ------------------------------
+                # page skeleton (axes, titles, limits, norm bands) comes from the template cache
+                if not fig:
+                    fig, axes = get_pageTemplate(plot_type, page_settings, norm, normFile, datLen)
+                    titlenamestr = f'{plot_type} \n' +condition[0:-1] +' ' +report[0:-1] +' Plots'
+                    fig.text(0.5,0.925, titlenamestr, fontsize=sf, color='k', horizontalalignment='center')
+
+                set_plotFonts()
+
                 # ----------------- Call labels and add ------------------------
                 
                 # Get all attributes that are lists of strings
@@ -848,17 +1417,11 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
                         curve_names = page_settings_lists[key]
                     elif 'Right' in key and 'Names' in key and Lnum == 1:
                         curve_names = page_settings_lists[key]
-                    elif 'Titles' in key:
-                        titles = page_settings_lists[key]
-                    elif 'UnitLabels' in key:
-                        unit_labels = page_settings_lists[key]
                     elif 'LowerLimit' in key:
                         lower_limits = page_settings_lists[key]
                     elif 'UpperLimit' in key:
                         upper_limits = page_settings_lists[key]
-                    elif 'YLabels' in key:
-                        y_Labels = page_settings_lists[key]
-                
+
                 # Loop through trajectory names (i.e. subplots)
                 for idx, label in enumerate(curve_names):
                     if label == '':
@@ -866,84 +1429,23 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
                     else:
                         data_label = label.removeprefix('Left').removeprefix('Right')
                         ax = axes[idx]
-                        ax.set_facecolor(FaceCol)
-                        ax.patch.set_alpha(FaceColAlpha)
-                        
-                        # set subplot parameters
-                        ax.set_title(titles[idx])
-                        
-                        # set y-labels for left column only
-                        if idx % 3 == 0:
-                            ax.set_ylabel(unit_labels[int(idx/3)])
-                            
-                        # set x-axis limits
-                        ax.set_xlim([0,datLen])
-                        
-                        # set x-ticks, blank unless bottom row
-                        if idx < 12:
-                            ax.set_xticks(list(range(0,datLen,xts)), ['','','','','',''])
-                        else:
-                            ax.set_xticks(list(range(0,datLen,xts)))
-                            ax.set_xlabel('% Gait Cycle')
-                            
-                        ax.fontsize = sf
-                        
+
                         # y-limits
                         ylower = lower_limits[idx]
                         yupper = upper_limits[idx]
-                        ax.set_ylim([ylower, yupper])
-                        
-                        # norm bands and y-label positions - only plot once
-                        if gcd_count == 0: 
-                            lowerN = np.subtract(np.array(dataNmean_dict[data_label]), np.array(dataNstd_dict[data_label]))
-                            upperN = np.add(np.array(dataNmean_dict[data_label]), np.array(dataNstd_dict[data_label]))
-                            ax.fill_between(x, lowerN, upperN, alpha=0.3, color='k')
-                            
-                            # motion direction text
-                            upperstr = (y_Labels[idx].split('-')[0])
-                            lowerstr = (y_Labels[idx].split('-')[1])
-                            plotxy = ax.get_position().get_points() # The default constructor takes the boundary "points" [[xmin, ymin], [xmax, ymax]].
-                            ytickpos = ax.get_yticks()
-                            
-                            # Convert y-data to display coordinates (pixels)
-                            top_two = sorted(ytickpos)[-2:]  # Get top two tick values
-                            y_display_1 = ax.transData.transform((0, top_two[0]))[1]
-                            y_display_2 = ax.transData.transform((0, top_two[1]))[1]
-                    
-                            # Convert display coordinates to figure coordinates (0–1)
-                            y_fig_1 = fig.transFigure.inverted().transform((0, y_display_1))[1]
-                            y_fig_2 = fig.transFigure.inverted().transform((0, y_display_2))[1]
-                    
-                            # Midpoint in figure coordinates
-                            y_top = (y_fig_1 + y_fig_2) / 2
-                            
-                            bot_two = sorted(ytickpos)[0:2]  # Get top two tick values
-                            y_display_3 = ax.transData.transform((0, bot_two[0]))[1]
-                            y_display_4 = ax.transData.transform((0, bot_two[1]))[1]
-                    
-                            # Convert display coordinates to figure coordinates (0–1)
-                            y_fig_3 = fig.transFigure.inverted().transform((0, y_display_3))[1]
-                            y_fig_4 = fig.transFigure.inverted().transform((0, y_display_4))[1]
-                    
-                            # Midpoint in figure coordinates
-                            y_bot = (y_fig_3 + y_fig_4) / 2
-                            
-                            # Add text to subplot
-                            plt.gcf().text(plotxy[0][0]-0.03, y_top - 0.001, upperstr, fontsize=sf-2, color='k')
-                            plt.gcf().text(plotxy[0][0]-0.03, y_bot - 0.001, lowerstr, fontsize=sf-2, color='k')
-                            
+
                         # find knee varus valgus range and flag if 10 degrees or greater
                         if gcdNum_selected <= 2 and 'Kinematics' in plot_type:
                             if 'KneeFlexExt' in data_label:
                                 knee_curve = data_dict[limb_spec[Lnum] + data_label]
-                                kf_max = knee_curve.index(max(knee_curve))
+                                kf_max = int(np.argmax(knee_curve))
                                 # get minimum, but must occur after max
-                                kf_min = knee_curve.index(min(knee_curve[kf_max:]))
+                                kf_min = kf_max + int(np.argmin(knee_curve[kf_max:]))
                                 # print(f'kf max: {kf_max}; kf min: {kf_min}')
                             elif 'KneeValgVar' in data_label:
                                 valg_curve = data_dict[limb_spec[Lnum] + data_label]
-                                valg_min = round(min(valg_curve[kf_max:kf_min+1]), 2)
-                                valg_max = round(max(valg_curve[kf_max:kf_min+1]), 2)
+                                valg_min = round(float(np.min(valg_curve[kf_max:kf_min+1])), 2)
+                                valg_max = round(float(np.max(valg_curve[kf_max:kf_min+1])), 2)
                                 valg_range = round(valg_max - valg_min, 2)
                                 text_color = 'k'
                                 correlation = round(np.corrcoef(knee_curve, valg_curve)[0, 1]**2,2)
@@ -962,8 +1464,8 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
                                         ax.text(x_pos, y_pos, l_string, fontsize=sf-2, color=text_color)
                                         
                                     # add min/max horizontal lines
-                                    ax.plot([0, 5], [valg_max, valg_max], color='b', linestyle='-', linewidth=0.75)
-                                    ax.plot([0, 5], [valg_min, valg_min], color='b', linestyle='-', linewidth=0.75)
+                                    add_axisLine(axis_lines, idx, [(0, valg_max), (5, valg_max)], 'b')
+                                    add_axisLine(axis_lines, idx, [(0, valg_min), (5, valg_min)], 'b')
                                 else:
                                     y_pos = 14
                                     r_string = f'R range: {valg_range} ({correlation})'
@@ -976,33 +1478,28 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
                                         ax.text(x_pos, y_pos, r_string, fontsize=sf-2, color=text_color)
                                     
                                     # add min/max horizontal lines
-                                    ax.plot([0, 5], [valg_max, valg_max], color='r', linestyle='-', linewidth=0.75)
-                                    ax.plot([0, 5], [valg_min, valg_min], color='r', linestyle='-', linewidth=0.75)
+                                    add_axisLine(axis_lines, idx, [(0, valg_max), (5, valg_max)], 'r')
+                                    add_axisLine(axis_lines, idx, [(0, valg_min), (5, valg_min)], 'r')
+                        
+                        # zero line - only needed once per subplot
+                        if idx not in axis_lines:
+                            add_axisLine(axis_lines, idx, [(0, 0), (datLen, 0)], 'k', linewidth=0.5, linestyle='--')
                         
-                        try: # need to skip if data from the data_label isn't available, e.g. when no trunk data exists.
-                            # plot data
-                            ax.plot(x,data_dict[limb_spec[Lnum] + data_label], color=cc[PlotNum], linewidth=0.75)
-                        except:
-                            # plot data
-                            ax.plot(0,0, color=cc[PlotNum], linewidth=0.75)
-                            
-                        # plot timing lines
-                        ax.hlines(0, xmin = 0, xmax = datLen, ls='--', color='k', linewidth=0.5)
+                        # plot data - skipped if data from the data_label isn't available, e.g. when no trunk data exists.
+                        if len(data_dict.get(limb_spec[Lnum] + data_label, ())) == datLen:
+                            add_axisLine(axis_lines, idx, np.column_stack((x, data_dict[limb_spec[Lnum] + data_label])), cc[PlotNum])
                         
                         # ipsi foot off lines
                         x1 = data_dict[limb_spec[Lnum] + 'FootOff'][0]/scaleX
-                        x2 = x1
-                        ax.plot((x1,x2),(ylower,yupper), color=cc[PlotNum], linewidth=0.75)
+                        add_axisLine(axis_lines, idx, [(x1, ylower), (x1, yupper)], cc[PlotNum])
                         
                         # contra foot off lines
                         x1 = data_dict[limb_spec[Lnum] + 'OppositeFootOff'][0]/scaleX
-                        x2 = x1
-                        ax.plot((x1,x2),(yupper - (yupper - ylower)*0.1,yupper), color=cc[PlotNum], linewidth=0.75)
+                        add_axisLine(axis_lines, idx, [(x1, yupper - (yupper - ylower)*0.1), (x1, yupper)], cc[PlotNum])
                         
                         # contra foot contact lines
                         x1 = data_dict[limb_spec[Lnum] + 'OppositeFootContact'][0]/scaleX
-                        x2 = x1
-                        ax.plot((x1,x2),(yupper - (yupper - ylower)*0.1,yupper), color=cc[PlotNum], linewidth=0.75)
+                        add_axisLine(axis_lines, idx, [(x1, yupper - (yupper - ylower)*0.1), (x1, yupper)], cc[PlotNum])
                         
                     
                 # -----------------  Adding patient info & file names ---------
@@ -1029,24 +1526,172 @@ def plot_Data(self, plot_type, page_settings, is_EMG):
         # Hide empty subplots if there are fewer graphs than subplots
         if varLR.get() == 0 and gcd_count > 0 and gcd_count%2 == 0 and 'axes' in locals():
             for fignum in range(0,len(fig.get_axes())):
-                if not axes[fignum].lines:
+                if fignum not in axis_lines:
                     axes[fignum].axis('off')
         elif (varLR.get() == 1 or varLR.get() == 2) and (gcd_count == gcdNum_selected or (gcd_count == 3 and gcdNum_selected > 3)) and 'axes' in locals():
             for fignum in range(0,len(fig.get_axes())):
-                if not axes[fignum].lines:
+                if fignum not in axis_lines:
                     axes[fignum].axis('off')
+    
+    if fig:
+        draw_axisLines(axes, axis_lines)
 
     try:
-        # Show the plot
-        plt.show()
-        
         # Save plot as PDF
-        pdffile.savefig(fig)
-        bookmarks.append((plot_type, marknum))
-        marknum += 1
+        save_page(self, fig, plot_type, page_settings)
     except:
         print(f'No {plot_type} data have been plotted for file {gcd_file}. Check file to ensure data is present if expected.')
 
+def set_plotFonts():
+    # xsmall, small, medium, and large font sizes
+    xf = 7
+    sf = 8
+    mf = 10
+    lf = 12
+
+    plt.rc('font', size=sf)          # controls default text sizes
+    plt.rc('axes', titlesize=sf)     # fontsize of the axes1 title
+    plt.rc('axes', labelsize=sf)     # fontsize of the x and y labels
+    plt.rc('xtick', labelsize=xf)    # fontsize of the tick labels
+    plt.rc('ytick', labelsize=xf)    # fontsize of the tick labels
+    plt.rc('legend', fontsize=mf)    # legend fontsize
+    plt.rc('figure', titlesize=lf)   # fontsize of the figure title
+
+def get_pageTemplate(plot_type, page_settings, norm, normFile, datLen):
+    # the page skeleton only depends on the page type, norm band and trial length (101 or 51 points)
+    # it is built once and kept pickled, every later page of the same type is a copy with only the trials added
+    template_key = (plot_type, normFile, datLen)
+    if template_key in page_templates:
+        fig = pickle.loads(page_templates[template_key])
+        plt.figure(fig) # make the copy the current figure
+        return fig, fig.get_axes()
+
+    fig, axes = build_pageTemplate(plot_type, page_settings, norm, datLen)
+    page_templates[template_key] = pickle.dumps(fig)
+    return fig, axes
+
+def build_pageTemplate(plot_type, page_settings, norm, datLen):
+    sf = 8
+    plt.rcParams.update({
+        'font.size': sf,
+        'axes.titlesize': 15,
+        'figure.titlesize': 15
+    })
+
+    # setting up the plot page
+    fig, axes = plt.subplots(6, 3, figsize=(8.5,11))
+    fig.tight_layout()
+    plt.subplots_adjust(left=0.12, right=0.9, top=0.9, bottom=0.01)
+
+    fig.suptitle(f"Shriners Children's - {site_name}, Motion Analysis Center", fontsize=15)
+
+    # Flatten the axes1 array
+    axes = list(axes.flatten())
+
+    set_plotFonts()
+    x = np.arange(datLen)
+    xts = int(round(datLen,-1)/5) # xtick axis spacing
+
+    # Get all attributes that are lists of strings - left and right names leave the same subplots blank
+    page_settings_lists = vars(page_settings)
+    for key in page_settings_lists.keys():
+        if 'Left' in key and 'Names' in key:
+            curve_names = page_settings_lists[key]
+        elif 'Titles' in key:
+            titles = page_settings_lists[key]
+        elif 'UnitLabels' in key:
+            unit_labels = page_settings_lists[key]
+        elif 'LowerLimit' in key:
+            lower_limits = page_settings_lists[key]
+        elif 'UpperLimit' in key:
+            upper_limits = page_settings_lists[key]
+        elif 'YLabels' in key:
+            y_Labels = page_settings_lists[key]
+
+    for idx, label in enumerate(curve_names):
+        if label == '':
+            continue
+        data_label = label.removeprefix('Left')
+        ax = axes[idx]
+        ax.set_facecolor(FaceCol)
+        ax.patch.set_alpha(FaceColAlpha)
+
+        # set subplot parameters
+        ax.set_title(titles[idx])
+
+        # set y-labels for left column only
+        if idx % 3 == 0:
+            ax.set_ylabel(unit_labels[int(idx/3)])
+
+        # set x-axis limits
+        ax.set_xlim([0,datLen])
+
+        # set x-ticks, blank unless bottom row
+        if idx < 12:
+            ax.set_xticks(list(range(0,datLen,xts)), ['','','','','',''])
+        else:
+            ax.set_xticks(list(range(0,datLen,xts)))
+            ax.set_xlabel('% Gait Cycle')
+
+        ax.fontsize = sf
+
+        # y-limits
+        ax.set_ylim([lower_limits[idx], upper_limits[idx]])
+
+        # norm bands
+        ax.fill_between(x, norm['lower'][data_label], norm['upper'][data_label], alpha=0.3, color='k')
+
+        # motion direction text
+        upperstr = (y_Labels[idx].split('-')[0])
+        lowerstr = (y_Labels[idx].split('-')[1])
+        plotxy = ax.get_position().get_points() # The default constructor takes the boundary "points" [[xmin, ymin], [xmax, ymax]].
+        ytickpos = ax.get_yticks()
+
+        # Convert y-data to display coordinates (pixels)
+        top_two = sorted(ytickpos)[-2:]  # Get top two tick values
+        y_display_1 = ax.transData.transform((0, top_two[0]))[1]
+        y_display_2 = ax.transData.transform((0, top_two[1]))[1]
+
+        # Convert display coordinates to figure coordinates (0–1)
+        y_fig_1 = fig.transFigure.inverted().transform((0, y_display_1))[1]
+        y_fig_2 = fig.transFigure.inverted().transform((0, y_display_2))[1]
+
+        # Midpoint in figure coordinates
+        y_top = (y_fig_1 + y_fig_2) / 2
+
+        bot_two = sorted(ytickpos)[0:2]  # Get top two tick values
+        y_display_3 = ax.transData.transform((0, bot_two[0]))[1]
+        y_display_4 = ax.transData.transform((0, bot_two[1]))[1]
+
+        # Convert display coordinates to figure coordinates (0–1)
+        y_fig_3 = fig.transFigure.inverted().transform((0, y_display_3))[1]
+        y_fig_4 = fig.transFigure.inverted().transform((0, y_display_4))[1]
+
+        # Midpoint in figure coordinates
+        y_bot = (y_fig_3 + y_fig_4) / 2
+
+        # Add text to subplot
+        fig.text(plotxy[0][0]-0.03, y_top - 0.001, upperstr, fontsize=sf-2, color='k')
+        fig.text(plotxy[0][0]-0.03, y_bot - 0.001, lowerstr, fontsize=sf-2, color='k')
+
+    return fig, axes
+
+def add_axisLine(axis_lines, idx, segment, color, linewidth=0.75, linestyle='-'):
+    # collect one line (curve or event tick) for subplot idx
+    lines = axis_lines.setdefault(idx, {'segments': [], 'colors': [], 'linewidths': [], 'linestyles': []})
+    lines['segments'].append(np.asarray(segment, dtype=np.float64))
+    lines['colors'].append(color)
+    lines['linewidths'].append(linewidth)
+    lines['linestyles'].append(linestyle)
+
+def draw_axisLines(axes, axis_lines):
+    from matplotlib.collections import LineCollection
+    # one LineCollection per subplot instead of an Artist per curve and tick - much faster to draw and fewer pdf objects
+    for idx, lines in axis_lines.items():
+        line_collection = LineCollection(lines['segments'], colors=lines['colors'], linewidths=lines['linewidths'], 
+                                         linestyles=lines['linestyles'], zorder=2) # zorder of plotted lines, above the norm bands
+        axes[idx].add_collection(line_collection, autolim=False)
+
 def plot_PatientTrialText(self, fig, plot_pack, is_EMG):
     # small, medium, and large font sizes
     sf = 8
@@ -1142,29 +1787,29 @@ def plot_PatientTrialText(self, fig, plot_pack, is_EMG):
     #Left
     if Lnum == 0 and LeftPlotNum < 7:
         try:
-            LGD = round(data_dict['LeftGDI'][0],2)
+            LGD = round(float(data_dict['LeftGDI'][0]),2)
             plt.gcf().text(firstcol+0.185, rowvec[LeftPlotNum-1], LGD, fontsize=sf-1, color='k')
         except:
             print(f'No left GDI found in GCD file {gcd_file}')
         
-        LSL = round(data_dict['LeftSpeed'][0]/1000,2)
+        LSL = round(float(data_dict['LeftSpeed'][0])/1000,2)
         plt.gcf().text(firstcol+0.215, rowvec[LeftPlotNum-1], LSL, fontsize=sf-1, color='k')
        
-        Lca = round(data_dict['LeftCadence'][0],2)
+        Lca = round(float(data_dict['LeftCadence'][0]),2)
         plt.gcf().text(firstcol+0.245, rowvec[LeftPlotNum-1], Lca, fontsize=sf-1, color='k')
         
     # Right
     elif (Lnum == 1 and RightPlotNum < 7 and gcdNum_selected >= 14) or (Lnum == 1 and RightPlotNum < 7 and gcdNum_selected < 14):
         try:
-            RGD = round(data_dict['RightGDI'][0],2)
+            RGD = round(float(data_dict['RightGDI'][0]),2)
             plt.gcf().text(nextcol+0.185, rowvec[RightPlotNum-1], RGD, fontsize=sf-1, color='k')
         except:
             print(f'No right GDI found in GCD file {gcd_file}')
         
-        RSL = round(data_dict['RightSpeed'][0]/1000,2)
+        RSL = round(float(data_dict['RightSpeed'][0])/1000,2)
         plt.gcf().text(nextcol+0.215, rowvec[RightPlotNum-1], RSL, fontsize=sf-1, color='k')
         
-        Rca = round(data_dict['RightCadence'][0],2)
+        Rca = round(float(data_dict['RightCadence'][0]),2)
         plt.gcf().text(nextcol+0.245, rowvec[RightPlotNum-1], Rca, fontsize=sf-1, color='k')
     
         
@@ -1236,7 +1881,8 @@ def plot_EMG(self):
         
         # If the variable is set
         if self.checkboxes[file].get():
-            gcd_file = file[0:-1] # pulling the "L" or "R" off the end that is assigned in checkbox selection
+            trial = trial_registry[file[0:-1]] # pulling the "L" or "R" off the end that is assigned in checkbox selection
+            gcd_file = trial['name']
             
             # Determine if both, left only, or right only EMG data will be plotted to specify how many files will plot to a single pdf page
             if gcd_count == 0:
@@ -1255,12 +1901,8 @@ def plot_EMG(self):
                 newFig = False
                 colIDX += 1
         # ----------------------------- Get patient data ----------------------
-            # list(checkboxes).index(gcd_file) pulls the index of the gcd_file in checkboxes to reference appropriate file-path when accessing .gcd files from subfolders
-            # gcd_file will have "L" or "R" ending to specify if the file should be plotted for left or right limbs respectively
-            
-            # index into folder file names is divided by 2 because each file is loaded into checkboxes twice for left/right plotting
-            ffnIDX = int(list(self.checkboxes).index(gcd_file+'L')/2)
-            data_dict = get_gcdData(gcd_file, folderfile_name[::-1][ffnIDX][0])
+            # the trial registry holds the session folder for each checkbox, see register_trial
+            data_dict = get_cachedTrial(gcd_file, trial['folder'])
             
         # ----------------------------- Get norm data -------------------------
             # ONLY GET and PLOT norm data once per column
@@ -1332,7 +1974,7 @@ def plot_EMG(self):
                     continue
                      
             # setting plotting parameters
-            x = list(range(0,datLen))
+            x = np.arange(datLen)
             # xts = int(round(datLen,-1)/5) # xtick axis spacing - rounds to 20 with 101 data points or 10 with 51 data points so x-ticks have 6 values from 0:100 or 0:50
             xf = 7
             sf = 8
@@ -1368,6 +2010,11 @@ def plot_EMG(self):
                     upper_limits = page_settings_lists[key]
                 elif 'YLabels' in key:
                     y_Labels = page_settings_lists[key]
+                elif 'TraceDPI' in key:
+                    trace_dpi = page_settings_lists[key]
+            
+            # norm envelopes of all muscles stretched to the length of this trial's EMG
+            norm_envelopes = get_normEnvelopes(dataNmean_dict, envelope_names, normFile, datLen)
             
             axIDX = [[0,1,2],
                      [3,4,5],
@@ -1381,33 +2028,30 @@ def plot_EMG(self):
                 ax.set_facecolor(FaceCol)
                 ax.patch.set_alpha(FaceColAlpha)
                 
-                # Get norm data and interpolate to length of collected EMG data
-                VariableData = np.array(dataNmean_dict[envelope_names[idx]])
-                Norm_EMGTimePoint = np.linspace(0, len(VariableData)-1 , 101)
-                x_TimePoint = np.linspace(0, len(VariableData)-1, len(range(0,datLen)))
-                upperUnScaleN = np.interp(x_TimePoint, Norm_EMGTimePoint, VariableData)
-                
+                # Get norm data interpolated to length of collected EMG data
+                upperUnScaleN = norm_envelopes[idx]
+
                 # Get EMG max absolute value, if data exists
                 emg_present = True
                 try:
-                    Edata = np.array(data_dict[data_label])
+                    Edata = data_dict[data_label]
                     EdataMean = np.mean(Edata)
                     Edata = Edata - EdataMean
-                    ScalFac = max(abs(Edata))
+                    ScalFac = np.max(np.abs(Edata))
                 except:
                     print(f'{limb_spec[Lnum]} {data_label} data not present')
                     ScalFac = max(upperUnScaleN)
                     emg_present  = False
                 
                 # norm bands
-                lowerN = [0] * datLen            
+                lowerN = np.zeros(datLen)
                 upperN = (ScalFac / max(upperUnScaleN)) * upperUnScaleN
                 ax.fill_between(x, lowerN, upperN, alpha=0.3, color='k')
                 
                 # plot EMG data 
                 if emg_present:
-                    ax.plot(x, Edata, color=cc[PlotNum], linewidth=0.5)
-                    
+                    ax.plot(*get_emgTrace(ax, x, Edata, trace_dpi), color=cc[PlotNum], linewidth=0.5)
+
                 y_limits = ax.get_ylim()
                 yupper = upper_limits[idx]
                 ylower = lower_limits[idx]
@@ -1477,19 +2121,47 @@ def plot_EMG(self):
                     axes1[fignum].axis('off')
         
         if self.checkboxes[file].get() and varLR.get() == 0 and gcd_count%2 == 0:
-            # Show the plot
-            plt.show()
             # Save plot as PDF
-            pdffile.savefig(fig)
-            bookmarks.append((f'EMGfile_{gcd_file[-6:-4]}', marknum))
-            marknum += 1
+            save_page(self, fig, f'EMGfile_{gcd_file[-6:-4]}', page_settings)
         elif self.checkboxes[file].get() and (varLR.get() == 1 or varLR.get() == 2) and (gcd_count == gcdNum_selected or (gcd_count == 3 and gcdNum_selected > 3)):
-            # Show the plot
-            plt.show()
             # Save plot as PDF
-            pdffile.savefig(fig)
-            bookmarks.append((f'EMGfile_{gcd_file[-6:-4]}', marknum))
-            marknum += 1
+            save_page(self, fig, f'EMGfile_{gcd_file[-6:-4]}', page_settings)
+
+def get_normEnvelopes(dataNmean_dict, envelope_names, normFile, datLen):
+    # 101 point norm envelopes of all muscles interpolated to datLen points in one go, kept for each (norm file, EMG length)
+    envelope_key = (normFile, datLen)
+    if envelope_key not in emg_envelopes:
+        envelopes = np.array([dataNmean_dict[name] for name in envelope_names])
+        
+        # each new point lies between two envelope points - same as np.interp for every muscle at once
+        x_TimePoint = np.linspace(0, envelopes.shape[1]-1, datLen)
+        lowerIDX = np.minimum(x_TimePoint.astype(int), envelopes.shape[1]-2)
+        weight = x_TimePoint - lowerIDX
+        emg_envelopes[envelope_key] = envelopes[:, lowerIDX]*(1 - weight) + envelopes[:, lowerIDX+1]*weight
+    return emg_envelopes[envelope_key]
+
+def get_emgTrace(ax, x, Edata, trace_dpi):
+    # lowest and highest sample in each pixel column of the axis, in the order they were recorded, so the
+    # trace looks the same as plotting every sample
+    if emg_full_fidelity or not trace_dpi:
+        return x, Edata
+    
+    fig_width = ax.get_figure().get_figwidth()
+    pixel_cols = max(int(ax.get_position().width*fig_width*trace_dpi), 1)
+    if len(Edata) <= 2*pixel_cols:
+        return x, Edata
+    
+    # samples split into equal columns, the last column is padded with its last sample
+    col_len = -(-len(Edata)//pixel_cols)
+    col_count = -(-len(Edata)//col_len)
+    Ecols = np.pad(Edata, (0, col_count*col_len - len(Edata)), mode='edge').reshape(col_count, col_len)
+    
+    col_start = np.arange(col_count)*col_len
+    minmaxIDX = np.sort(np.stack([col_start + Ecols.argmin(axis=1), col_start + Ecols.argmax(axis=1)], axis=1), axis=1).ravel()
+    
+    # keep the first and last sample so the trace spans the same x range
+    keepIDX = np.unique(np.concatenate(([0], np.minimum(minmaxIDX, len(Edata)-1), [len(Edata)-1])))
+    return x[keepIDX], Edata[keepIDX]
 
 def plot_SpatioTemporal(self):
     global foldername
@@ -1520,16 +2192,14 @@ def plot_SpatioTemporal(self):
     for file in self.checkboxes:
         # If the variable is set
         if self.checkboxes[file].get():
-            gcd_file = file[0:-1] # pulling the "L" or "R" off the end that is assigned in checkbox selection
+            trial = trial_registry[file[0:-1]] # pulling the "L" or "R" off the end that is assigned in checkbox selection
+            gcd_file = trial['name']
             # Open the .gcd file
             # print(gcd_file)
             
         # ----------------------------- Get patient data ----------------------
-            # list(checkboxes).index(gcd_file) pulls the index of the gcd_file in checkboxes to reference appropriate file-path when accessing .gcd files from subfolders
-            # gcd_file will have "L" or "R" ending to specify if the file should be plotted for left or right limbs respectively
-            ffnIDX = int(list(self.checkboxes).index(gcd_file+'L')/2)
-            data_dict = get_gcdData(gcd_file, folderfile_name[::-1][ffnIDX][0])
-            # data_dict = get_gcdData(gcd_file, folderfile_name[list(checkboxes).index(gcd_file+'L')][0])
+            # the trial registry holds the session folder for each checkbox, see register_trial
+            data_dict = get_cachedTrial(gcd_file, trial['folder'])
             
         # ----------------------------- Get norm data -------------------------
             # ONLY GET and PLOT norm data once 
@@ -1896,14 +2566,13 @@ def plot_SpatioTemporal(self):
     if gcdNum_selected > 16:
         plt.gcf().text(firstcol, lastrow+rowspace, '**ADDITIONAL DATA HAS NOT BEEN PRINTED HERE - current limit is 8 files each side.', fontsize=lf, color='k')
                
-    # Show the plot
-    plt.show()
     # Save plot as PDF
-    pdffile.savefig(fig)
-    bookmarks.append(('Spatiotemporal', marknum))
-    marknum += 1
+    save_page(self, fig, 'Spatiotemporal')
     
 def plot_NewSpatioTemporal(self):
+    # only page that uses seaborn, imported here so it is not loaded at program start
+    import seaborn as sns
+    from matplotlib.gridspec import GridSpec
     
     global foldername
     global bookmarks
@@ -1933,16 +2602,14 @@ def plot_NewSpatioTemporal(self):
     for file in self.checkboxes:
         # If the variable is set
         if self.checkboxes[file].get():
-            gcd_file = file[0:-1] # pulling the "L" or "R" off the end that is assigned in checkbox selection
+            trial = trial_registry[file[0:-1]] # pulling the "L" or "R" off the end that is assigned in checkbox selection
+            gcd_file = trial['name']
             # Open the .gcd file
             # print(gcd_file)
             
         # ----------------------------- Get patient data ----------------------
-            # list(checkboxes).index(gcd_file) pulls the index of the gcd_file in checkboxes to reference appropriate file-path when accessing .gcd files from subfolders
-            # gcd_file will have "L" or "R" ending to specify if the file should be plotted for left or right limbs respectively
-            ffnIDX = int(list(self.checkboxes).index(gcd_file+'L')/2)
-            data_dict = get_gcdData(gcd_file, folderfile_name[::-1][ffnIDX][0])
-            # data_dict = get_gcdData(gcd_file, folderfile_name[list(checkboxes).index(gcd_file+'L')][0])
+            # the trial registry holds the session folder for each checkbox, see register_trial
+            data_dict = get_cachedTrial(gcd_file, trial['folder'])
             
         # ----------------------------- Get norm data -------------------------
             # ONLY GET and PLOT norm data once 
@@ -2127,13 +2794,275 @@ def plot_NewSpatioTemporal(self):
             gcd_count += 1
                 
              
-    # Show the plot
-    plt.show()
     # Save plot as PDF
-    pdffile.savefig(fig)
-    bookmarks.append(('Spatiotemporal', marknum))
-    marknum += 1
+    save_page(self, fig, 'Spatiotemporal')
+
+### ------------------ Report page sets ---------------------------------------
+# pages plotted by each report button, in plotting order
+report_pages = {
+    'kinematics':           [plot_kinematics, plot_FootModel],
+    'kinetics':             [plot_sagittalKinetics, plot_coronalKinetics],
+    'emg':                  [plot_EMG],
+    'kinematics-kinetics':  [plot_kinematics, plot_sagittalKinetics, plot_coronalKinetics, plot_FootModel],
+    'basic':                [plot_kinematics, plot_sagittalKinetics, plot_coronalKinetics, plot_MuscleLengthVel, plot_SpatioTemporal, plot_FootModel],
+    'full':                 [plot_kinematics, plot_sagittalKinetics, plot_coronalKinetics, plot_MuscleLengthVel, plot_EMG, plot_SpatioTemporal, plot_FootModel],
+    'spatiotemporal':       [plot_NewSpatioTemporal],
+    }
+
+def plot_report(self, report_name):
+    # multi-page reports are built in parallel render workers, unless each page has to be checked in its own window
+    if render_workers > 1 and len(report_pages[report_name]) > 1 and page_preview != 'windows':
+        plot_reportParallel(self, report_name)
+    else:
+        for plot_page in report_pages[report_name]:
+            plot_page(self)
+
+### ------------------ Parallel page rendering --------------------------------
+# process pool kept for the session so workers keep their loaded norm data between reports, trials come with each job
+render_pool         = None
+# set in a render worker while it builds a page - save_page hands figures back instead of writing them to the pdf
+rendered_pages      = None
+
+def get_renderPool():
+    global render_pool
+    if render_pool is None:
+        render_pool = concurrent.futures.ProcessPoolExecutor(max_workers=render_workers, 
+                                                             mp_context=multiprocessing.get_context('spawn'),
+                                                             initializer=init_renderWorker)
+    return render_pool
+
+def init_renderWorker():
+    global page_preview
+    # workers never open windows, pages are drawn off screen
+    plt.switch_backend('Agg')
+    page_preview = 'none'
+
+def get_reportState(self):
+    # everything the plotting functions read from the GUI and the report globals, to rebuild the report in a worker
+    return {'checkboxes':       {file: self.checkboxes[file].get() for file in self.checkboxes},
+            'limbs':            varLR.get(),
+            'trial_registry':   trial_registry,
+            'report_info':      (PatientName, MRN[0:-1], diagnosis, studydate, visit, condition[0:-1], 
+                                 brace, walkaid, report[0:-1], VSTmodelused),
+            'age':              age,
+            'emg_full_fidelity': emg_full_fidelity,
+            'trial_data':       get_loadedTrials(self),
+            }
 
-#Calls the main Function
-app = Motion_Report()
-app.mainloop()
+def get_loadedTrials(self):
+    # parsed trials of the ticked files, sent to the workers so they are not parsed again - trials loaded in the
+    # background come from the trial cache, the thread still loading a trial is waited for, the rest are loaded here
+    trial_ids = {file[0:-1] for file in self.checkboxes if self.checkboxes[file].get()}
+    trial_paths = set()
+    for trial_id in sorted(trial_ids):
+        trial = trial_registry[trial_id]
+        try:
+            get_cachedTrial(trial['name'], trial['folder'])
+        except Exception as e:
+            # left to the page builder, which reports the file like plotting one page after another does
+            print(f"{trial['name']} could not be loaded before plotting: {e}")
+        trial_paths.add(os.path.abspath(os.path.join(trial['folder'], trial['name'])))
+    with trial_cache_lock:
+        return {trial_key: data_dict for trial_key, data_dict in trial_cache.items() if trial_key[0] in trial_paths}
+
+def set_reportState(report_state):
+    global varLR
+    global trial_registry
+    global age
+    global fne
+    global pid
+    global dte
+    global emg_full_fidelity
+    
+    varLR = BatchValue(report_state['limbs'])
+    emg_full_fidelity = report_state['emg_full_fidelity']
+    trial_registry = report_state['trial_registry']
+    age = report_state['age']
+    fne, pid, dte = [''], [''], ['']
+    set_reportInfo(*report_state['report_info'])
+    
+    # trials of this report only, so the worker does not keep every trial it has plotted, nor page skeletons and
+    # norm envelopes made for the trial lengths of earlier reports
+    clear_trialCache()
+    trial_cache.update(report_state['trial_data'])
+    page_templates.clear()
+    emg_envelopes.clear()
+    return types.SimpleNamespace(checkboxes={file: BatchValue(value) for file, value in report_state['checkboxes'].items()})
+
+def render_reportPages(report_state, report_name, page_idx):
+    # runs in a render worker - builds the figures of one page type and returns them with their bookmark names,
+    # and the worker's trial cache hits and misses for the log
+    global rendered_pages
+    
+    selection = set_reportState(report_state)
+    rendered_pages = []
+    try:
+        report_pages[report_name][page_idx](selection)
+        return rendered_pages, dict(trial_cache_stats)
+    finally:
+        rendered_pages = None
+
+def plot_reportParallel(self, report_name):
+    global render_pool
+    
+    report_state = get_reportState(self)
+    page_count = len(report_pages[report_name])
+    page_idx = 0
+    try:
+        page_results = get_renderPool().map(render_reportPages, [report_state]*page_count, [report_name]*page_count, range(page_count))
+        
+        # pages come back in report order, so the pdf and bookmarks are in the same order as plotting one after another
+        for pages, worker_stats in page_results:
+            for bookmark_name, fig in pages:
+                save_page(self, fig, bookmark_name)
+            with trial_cache_lock:
+                for stat in trial_cache_stats:
+                    trial_cache_stats[stat] += worker_stats[stat]
+            page_idx += 1
+    except Exception as e:
+        print(f'Parallel page rendering stopped ({e}), plotting the remaining pages one after another')
+        if isinstance(e, concurrent.futures.BrokenExecutor):
+            render_pool = None
+        for plot_page in report_pages[report_name][page_idx:]:
+            plot_page(self)
+
+### ------------------ Program start ------------------------------------------
+def start_importWarmup():
+    # import the plotting and pdf modules on a background thread so the first report does not wait for them
+    # importing does not touch tk, the window keeps working while this runs
+    def import_modules():
+        for module_name in warmup_modules:
+            try:
+                importlib.import_module(module_name)
+            except ImportError as e:
+                print(f'{module_name} could not be imported: {e}')
+    threading.Thread(target=import_modules, name='import warm-up', daemon=True).start()
+
+warmup_modules = ['numpy', 'matplotlib.pyplot', 'matplotlib.backends.backend_pdf', 'matplotlib.collections', 'seaborn']
+
+### ------------------ Batch reports (no GUI) ---------------------------------
+class BatchValue:
+    # stands in for the tk variables (checkboxes, limb selection) read by the plotting functions
+    def __init__(self, value):
+        self.value = value
+        
+    def get(self):
+        return self.value
+
+class BatchSelection:
+    # stands in for SelectData_Page - left/right file selections for one report
+    def __init__(self, trial_files, limbs, patient_folder):
+        self.checkboxes = {}
+        trial_registry.clear()
+        
+        for trial_file in trial_files:
+            trial_id = register_trial(trial_file, patient_folder)
+            gcdfile = trial_registry[trial_id]['name']
+            # limbs: 0 = left & right, 1 = left only, 2 = right only
+            self.checkboxes.update({trial_id+'L': BatchValue(gcdfile if limbs != 2 else ''), 
+                                    trial_id+'R': BatchValue(gcdfile if limbs != 1 else '')})
+
+def get_batchArguments(argv):
+    parser = argparse.ArgumentParser(description="Make Shriners Children's motion lab pdf reports without the GUI")
+    parser.add_argument('patient_folders', nargs='+', help='top-level patient folder(s), one report is made for each')
+    parser.add_argument('--trials', nargs='+', default=['**/*.[gG][cC][dD]'], help='gcd file names or glob patterns relative to the patient folder (default: all gcd files)')
+    parser.add_argument('--limbs', choices=['both','left','right'], default='both', help='limbs to plot (default: both)')
+    parser.add_argument('--report', choices=list(report_pages), default='full', help='pages to plot, same as the report buttons (default: full)')
+    parser.add_argument('--output-folder', help='folder for the pdf and processing log, made if it does not exist (default: the patient folder)')
+    parser.add_argument('--full-emg', action='store_true', help='draw every raw EMG sample instead of one low and high point per pixel column')
+    parser.add_argument('--render-workers', type=int, default=render_workers, help=f'worker processes building the pages at the same time, 1 plots them one after another (default: {render_workers})')
+
+    # patient and visit info - defaults come from the static python file and the first drop down option, as in the GUI
+    parser.add_argument('--name', help='patient first and last name')
+    parser.add_argument('--mrn', help='medical record number')
+    parser.add_argument('--date', help='date of study, mm-dd-yyyy')
+    parser.add_argument('--diagnosis', default=Dx_select[0])
+    parser.add_argument('--visit', default=visit_select[0])
+    parser.add_argument('--condition', default='Barefoot')
+    parser.add_argument('--brace')
+    parser.add_argument('--walkaid')
+    parser.add_argument('--report-label', default='Quick Check', help="'Report Type' printed on the pages and used in the pdf name")
+    parser.add_argument('--vst', default=vstused_select[0], help='VST used')
+    return parser.parse_args(argv)
+
+def find_batchTrials(patient_folder, trial_patterns):
+    trial_files = []
+    for pattern in trial_patterns:
+        for trial_file in sorted(glob.glob(os.path.join(patient_folder, pattern), recursive=True)):
+            if os.path.isfile(trial_file) and trial_file not in trial_files:
+                trial_files.append(trial_file)
+    return trial_files
+
+def make_batchReport(patient_folder, args):
+    global varLR
+    
+    trial_files = find_batchTrials(patient_folder, args.trials)
+    if not trial_files:
+        print(f'No gcd files found in {patient_folder}, no report made')
+        return None
+    
+    # sets the patient info globals (pid, fne, brt, dte, wat, age) from the static python file, or defaults
+    get_PatientInfo_fromPyfile(patient_folder)
+    
+    varLR = BatchValue(['both','left','right'].index(args.limbs))
+    selection = BatchSelection(trial_files, varLR.get(), patient_folder)
+    
+    clear_bookmarks()
+    set_reportInfo(args.name or fne[0], args.mrn or pid[0], args.diagnosis, args.date or dte[0], 
+                   args.visit, args.condition, args.brace or brt[0], args.walkaid or wat[0], 
+                   args.report_label, args.vst)
+    # the pdf is only written at the first page, so a missing or read-only folder is found here rather than
+    # being taken for a trial with no data
+    output_folder = args.output_folder or patient_folder
+    os.makedirs(output_folder, exist_ok=True)
+    if not os.access(output_folder, os.W_OK):
+        raise PermissionError(f'cannot write to the output folder {output_folder}')
+    open_pdf(output_folder)
+    
+    try:
+        plot_report(selection, args.report)
+    finally:
+        output_path = write_pdf()
+        plt.close('all')
+    if not bookmarks:
+        raise RuntimeError(f'no pages were saved to {output_path}')
+        
+    write_processingLog(selection)
+    print(f'Report saved to {output_path}')
+    return output_path
+
+def run_batchReports(argv):
+    global page_preview
+    global emg_full_fidelity
+    global render_workers
+    args = get_batchArguments(argv)
+    emg_full_fidelity = args.full_emg
+    render_workers = args.render_workers
+
+    # no windows are opened, pages are drawn straight to the pdf
+    plt.switch_backend('Agg')
+    page_preview = 'none'
+    
+    failed = []
+    for patient_folder in args.patient_folders:
+        try:
+            make_batchReport(patient_folder, args)
+        except Exception as e:
+            print(f'Report for {patient_folder} could not be made: {e}')
+            failed.append(patient_folder)
+            
+    if failed:
+        print(f'{len(failed)} of {len(args.patient_folders)} reports failed: {failed}')
+    return len(failed)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # command line arguments given - make the reports without the GUI
+        sys.exit(run_batchReports(sys.argv[1:]))
+    else:
+        # plotting modules are imported while the patient folder is picked
+        start_importWarmup()
+        
+        #Calls the main Function
+        app = Motion_Report()
+        app.mainloop()
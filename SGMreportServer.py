@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+'''
+Long running report/EMG worker for the Nexus pipelines
+
+Nexus starts a new python.exe for every Run Python Operation, and each one has to import numpy, scipy and
+matplotlib again before it does any work. The server is started once and keeps those libraries, the norm data
+and the parsed trials loaded. The Nexus operations run this file as a small client that hands the job to the server.
+
+    python SGMreportServer.py serve                     start the server (leave the window open)
+    python SGMreportServer.py stop                      stop a running server
+    python SGMreportServer.py emg [gcd file] [--rate]   scale the EMG of a trial (current Nexus trial if no file)
+    python SGMreportServer.py report <patient folder> [batch report options]
+                                                        make a pdf report, same options as the batch mode of
+                                                        SGMreportGenerator_v3.0.3.py
+Add --local to emg or report to run the job in this process instead of the server (for testing, or when no server
+is running - the client also does this by itself when it cannot reach the server).
+'''
+import argparse
+import contextlib
+import importlib.util
+import io
+import multiprocessing
+import multiprocessing.connection
+import os
+import secrets
+import sys
+import traceback
+
+# light, does not import numpy - the client stays quick to start
+from TrialProviders_SGM import FileTrialProvider, NexusTrialProvider
+
+# localhost only - jobs are pickled, so only clients that know the server's key are let in
+server_address      = ('localhost', 6123)
+
+# a new random key is made each time the server starts and written here, readable only by the user who started it
+# (on Windows the file is protected by the user's profile folder) - clients of other users cannot read it
+server_key_file     = os.path.join(os.path.expanduser('~'), 'SGMreportCache', 'server_key')
+
+code_folder         = os.path.dirname(os.path.abspath(__file__))
+report_script       = os.path.join(code_folder, 'SGMreportGenerator_v3.0.3.py')
+report_module_name  = 'SGMreportGenerator'
+
+### ------------------ Job modules --------------------------------------------
+def get_reportModule():
+    # the report script has dots in its file name so it is loaded from its path, once per process
+    if report_module_name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(report_module_name, report_script)
+        report_module = importlib.util.module_from_spec(spec)
+        sys.modules[report_module_name] = report_module
+        spec.loader.exec_module(report_module)
+    return sys.modules[report_module_name]
+
+def get_emgModule():
+    if code_folder not in sys.path:
+        sys.path.insert(0, code_folder)
+    return importlib.import_module('Py3_AmplifyEMG_MLS')
+
+def run_job(job):
+    # runs one job in this process, the printed output goes back to the client so it shows in the Nexus log
+    job_output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(job_output), contextlib.redirect_stderr(job_output):
+            if job['job'] == 'emg':
+                # the rate is worked out by the client - when it has none the file's rate section or the default is
+                # used, never the trial open in Nexus, which may not be the file of the job
+                get_emgModule().scale_MLSemg(job['gcd_file'], job['rate'], provider=FileTrialProvider(job['gcd_file']))
+                result = 0
+            elif job['job'] == 'report':
+                result = get_reportModule().run_batchReports(job['argv'])
+            else:
+                raise ValueError(f"unknown job {job['job']}")
+        return {'ok': True, 'result': result, 'output': job_output.getvalue()}
+    except SystemExit as e:
+        # bad report options - argparse has printed why, the server keeps running
+        return {'ok': False, 'result': e.code, 'output': job_output.getvalue()}
+    except Exception:
+        return {'ok': False, 'result': 1, 'output': job_output.getvalue() + traceback.format_exc()}
+
+### ------------------ Server -------------------------------------------------
+def make_serverKey():
+    # written to a temporary file created with owner only permissions and swapped in
+    server_key = secrets.token_hex(32).encode('ascii')
+    os.makedirs(os.path.dirname(server_key_file), exist_ok=True)
+    temp_file = server_key_file + '.tmp'
+    if os.path.exists(temp_file):
+        os.remove(temp_file)
+    fd = os.open(temp_file, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(server_key)
+    os.replace(temp_file, server_key_file)
+    return server_key
+
+def is_validJob(job):
+    # anything else is dropped without being run
+    if not isinstance(job, dict) or job.get('job') not in ('stop', 'emg', 'report'):
+        return False
+    if job['job'] == 'emg':
+        return isinstance(job.get('gcd_file'), str) and (job.get('rate') is None or isinstance(job['rate'], (int, float)))
+    if job['job'] == 'report':
+        return isinstance(job.get('argv'), list) and all(isinstance(arg, str) for arg in job['argv'])
+    return True
+
+def run_server():
+    # import everything up front, so the first job is as fast as the rest
+    report_module = get_reportModule()
+    report_module.page_preview = 'none'
+    report_module.plt.switch_backend('Agg')
+    get_emgModule()
+    for module_name in report_module.warmup_modules:
+        importlib.import_module(module_name)
+
+    server_key = make_serverKey()
+    try:
+        serve_jobs(server_key)
+    finally:
+        # a stopped server's key is of no use to anyone
+        if os.path.exists(server_key_file):
+            os.remove(server_key_file)
+
+def serve_jobs(server_key):
+    # jobs are run one at a time, in the order they come in - matplotlib is not safe to use from several threads
+    with multiprocessing.connection.Listener(server_address, authkey=server_key) as listener:
+        print(f'SGM report server listening on {server_address[0]}:{server_address[1]}')
+        while True:
+            try:
+                with listener.accept() as connection:
+                    job = connection.recv()
+                    if not is_validJob(job):
+                        print(f'Job not run, not a valid job: {job!r:.200}')
+                        connection.send({'ok': False, 'result': 1, 'output': 'Not a valid SGM report server job\n'})
+                        continue
+
+                    if job['job'] == 'stop':
+                        connection.send({'ok': True, 'result': 0, 'output': 'SGM report server stopped\n'})
+                        break
+
+                    print(f"{job['job']} job: {job.get('gcd_file') or ' '.join(job.get('argv', []))}")
+                    response = run_job(job)
+                    print(response['output'], end='')
+                    connection.send(response)
+            except (EOFError, OSError, multiprocessing.AuthenticationError) as e:
+                # client went away or was not allowed - keep serving
+                print(f'Connection dropped: {e}')
+
+### ------------------ Client -------------------------------------------------
+def submit_job(job):
+    # send a job to the server and wait for it to finish, None if no server of this user is running or it cannot be reached
+    try:
+        with open(server_key_file, 'rb') as f:
+            server_key = f.read()
+    except OSError:
+        return None
+    try:
+        with multiprocessing.connection.Client(server_address, authkey=server_key) as connection:
+            connection.send(job)
+            return connection.recv()
+    except (OSError, EOFError, multiprocessing.AuthenticationError) as e:
+        print(f'SGM report server could not be reached ({e})')
+        return None
+
+def get_nexusTrial():
+    # gcd file and EMG sample rate of the trial open in Nexus
+    provider = NexusTrialProvider()
+    gcd_file = provider.get_trialPath()
+    return gcd_file, provider.get_emgRate(gcd_file)
+
+def get_clientArguments(argv):
+    parser = argparse.ArgumentParser(description='SGM report/EMG server and client')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('serve', help='start the server')
+    commands.add_parser('stop', help='stop a running server')
+
+    emg_parser = commands.add_parser('emg', help='scale the EMG of a gcd file')
+    emg_parser.add_argument('gcd_file', nargs='?', help='gcd file to scale (default: the trial open in Nexus)')
+    emg_parser.add_argument('--rate', type=float, help='EMG sample rate in Hz (default: from Nexus for the current trial, 1000 for a given gcd file)')
+    emg_parser.add_argument('--local', action='store_true', help='run in this process instead of the server')
+
+    report_parser = commands.add_parser('report', help='make a pdf report, options as in the batch mode of the report generator')
+    report_parser.add_argument('--local', action='store_true', help='run in this process instead of the server')
+
+    # report options are passed on to the report generator as they are
+    args, report_argv = parser.parse_known_args(argv)
+    if report_argv and args.command != 'report':
+        parser.error(f"unrecognized arguments: {' '.join(report_argv)}")
+    args.report_argv = report_argv
+    return args
+
+def run_client(argv):
+    args = get_clientArguments(argv)
+    if args.command == 'serve':
+        run_server()
+        return 0
+
+    if args.command == 'stop':
+        response = submit_job({'job': 'stop'})
+        print(response['output'] if response else 'No SGM report server is running')
+        return 0
+
+    if args.command == 'emg':
+        gcd_file, SR = args.gcd_file, args.rate
+        if gcd_file is None:
+            gcd_file, nexus_rate = get_nexusTrial()
+            SR = SR or nexus_rate
+        job = {'job': 'emg', 'gcd_file': gcd_file, 'rate': SR}
+    else:
+        job = {'job': 'report', 'argv': args.report_argv}
+
+    response = None if args.local else submit_job(job)
+    if response is None:
+        if not args.local:
+            print('No SGM report server available, running the job here')
+        response = run_job(job)
+
+    print(response['output'], end='')
+    return response['result'] if response['ok'] else 1
+
+# pages of a report are built in worker processes that start by loading this file
+# they need the report module under the same name as the server so the page functions can be found
+if __name__ == '__mp_main__' and multiprocessing.parent_process() is not None:
+    get_reportModule()
+
+if __name__ == '__main__':
+    sys.exit(run_client(sys.argv[1:]))
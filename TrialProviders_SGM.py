@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Where the EMG scaling gets its trial and EMG sample rate from
+
+Each provider has
+    get_trialPath()             the gcd file of the trial to scale
+    get_emgRate(filenamepath)   the EMG sample rate of that file in Hz, None if it is not known
+
+NexusTrialProvider  - the trial open in Nexus, the Nexus connection is only opened when one of these is called
+FileTrialProvider   - a gcd file given on the command line, with a given rate, the rate section of the file, or a default
+MockTrialProvider   - a made up trial with raw EMG written to a local folder, to try out or time the scaling anywhere
+
+GCD files exported by Nexus do not hold the EMG sample rate. rate_key is a section this code reads when a file has it
+(MockTrialProvider writes one, and a site can add it to its own files) - for real Nexus exports FileTrialProvider
+always uses the given rate or its default_rate, so set that to the rate of the lab's EMG system.
+
+Nothing heavy is imported here, so the client of SGMreportServer can use these without loading numpy.
+"""
+import os
+
+# gcd section with the EMG sample rate of the trial - not part of Nexus exports, see above
+rate_key            = 'EMGSampleRate'
+
+def get_gcdRate(filenamepath):
+    # EMG sample rate from the rate section of a gcd file, None if the file has none
+    with open(filenamepath, 'r') as f:
+        for line in f:
+            if line[0] == '!' and line[1:].rstrip('\n') == rate_key:
+                try:
+                    return float(next(f))
+                except (StopIteration, ValueError):
+                    print(f'{rate_key} of {filenamepath} could not be read')
+                    return None
+    return None
+
+class NexusTrialProvider:
+    def __init__(self):
+        self.vicon = None
+
+    def get_vicon(self):
+        # connected on first use, so the provider can be made without Nexus running
+        if self.vicon is None:
+            from viconnexusapi import ViconNexus
+            self.vicon = ViconNexus.ViconNexus()
+        return self.vicon
+
+    def get_trialPath(self):
+        # call vicon to get file path and file name for trial of interest
+        FilePath, FileName = self.get_vicon().GetTrialName()
+        return FilePath + "\\" + FileName + '.GCD'
+
+    def get_emgRate(self, filenamepath=None):
+        # sample rate of the device named EMG in Nexus, None if there is no EMG device
+        SR = None
+        DeviceIDs = self.get_vicon().GetDeviceIDs()
+        for DeviceID in DeviceIDs:
+            [name, typeID, rate, deviceOutputIDs, forceplate, eyetracker] = self.get_vicon().GetDeviceDetails(DeviceID)
+            if name == 'EMG':
+                SR = rate
+                print(f'EMG sample rate extracted is: {SR}')
+        return SR
+
+class FileTrialProvider:
+    def __init__(self, filenamepath=None, SR=None, default_rate=None):
+        # SR is used for every file when given, otherwise the rate section of the file, then default_rate
+        self.filenamepath = filenamepath
+        self.SR = SR
+        self.default_rate = default_rate
+
+    def get_trialPath(self):
+        return self.filenamepath
+
+    def get_emgRate(self, filenamepath=None):
+        if self.SR:
+            return self.SR
+        return get_gcdRate(filenamepath or self.filenamepath) or self.default_rate
+
+class MockTrialProvider:
+    # raw EMG channels of the EMG report page
+    muscles = ['LeftRawLRectFem','LeftRawLVastLat', 'LeftRawLMedHams', 'LeftRawLGasTroc', 'LeftRawLTibAnte',
+               'RightRawRRectFem','RightRawRVastLat', 'RightRawRMedHams', 'RightRawRGasTroc', 'RightRawRTibAnte']
+
+    def __init__(self, folder, SR=1000, samples=2000, emg_freq=80, seed=0, file_name='MockTrial.GCD'):
+        # emg_freq is the dominant frequency of the made up EMG, outside 10-501 Hz the file should not be scaled
+        self.folder = folder
+        self.SR = SR
+        self.samples = samples
+        self.emg_freq = emg_freq
+        self.seed = seed
+        self.file_name = file_name
+
+    def get_trialPath(self):
+        # a new mock gcd every time, scaling changes the file
+        filenamepath = os.path.join(self.folder, self.file_name)
+        os.makedirs(self.folder, exist_ok=True)
+        with open(filenamepath, 'w') as f:
+            f.writelines(self.get_gcdLines())
+        return filenamepath
+
+    def get_emgRate(self, filenamepath=None):
+        return self.SR
+
+    def get_gcdLines(self):
+        import numpy as np
+        rng = np.random.default_rng(self.seed)
+
+        # a kinematic section, which scaling must leave as it is
+        gcd_lines = ['!LeftKneeFlexExt\n'] + [f'{value!r}\n' for value in (30*np.sin(np.linspace(0, 2*np.pi, 51))).tolist()]
+        gcd_lines += [f'!{rate_key}\n', f'{self.SR}\n']
+
+        # bursts of an emg_freq oscillation with noise, in mV
+        t = np.arange(self.samples)/self.SR
+        bursts = 0.2 + np.exp(-((t/t[-1] - 0.1)/0.08)**2) + np.exp(-((t/t[-1] - 0.6)/0.1)**2)
+        for muscle in self.muscles:
+            emg = bursts*(np.sin(2*np.pi*self.emg_freq*t + rng.uniform(0, 2*np.pi)) + 0.5*rng.normal(0, 1, self.samples))*0.05
+            gcd_lines += [f'!{muscle}\n'] + [f'{value!r}\n' for value in emg.tolist()]
+        return gcd_lines
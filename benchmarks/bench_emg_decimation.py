@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+'''
+PDF size and drawing time of an EMG page with every raw sample drawn, and with the traces reduced to the lowest
+and highest sample of each pixel column (get_emgTrace in SGMreportGenerator)
+
+Builds a page like plot_EMG (6 x 3 subplots, 5 muscles x 3 trials) from made up EMG, saves it to a pdf in memory
+and draws it to a png (roughly what a pdf viewer does when the page is opened), e.g.
+    python benchmarks/bench_emg_decimation.py --samples 2400 --dpi 300
+'''
+import argparse
+import importlib.util
+import io
+import os
+import sys
+import time
+
+script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SGMreportGenerator_v3.0.3.py')
+
+def get_reportModule():
+    # the script has dots in its file name, so it is loaded from its path (the GUI is not started)
+    spec = importlib.util.spec_from_file_location('SGMreportGenerator', script_path)
+    report_module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(report_module)
+    return report_module
+
+def get_emgData(np, samples, seed=0):
+    # bursts of noise, about what a raw EMG of one gait cycle looks like
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0, 1, samples)
+    bursts = 0.2 + np.exp(-((t - 0.1)/0.08)**2) + np.exp(-((t - 0.6)/0.1)**2)
+    return rng.normal(0, 1, samples)*bursts
+
+def make_page(report_module, samples, trace_dpi):
+    np, plt = report_module.np, report_module.plt
+    fig, axes1 = plt.subplots(6, 3, figsize=(8.5,11))
+    fig.tight_layout()
+    x = np.arange(samples)
+
+    point_count = 0
+    for row in range(5):
+        for col in range(3):
+            ax = axes1[row, col]
+            Edata = get_emgData(np, samples, seed=row*3 + col)
+            xPlot, Eplot = report_module.get_emgTrace(ax, x, Edata, trace_dpi)
+            ax.plot(xPlot, Eplot, linewidth=0.5)
+            point_count += len(Eplot)
+    return fig, point_count
+
+def time_page(report_module, samples, trace_dpi, full_fidelity, runs):
+    plt = report_module.plt
+    report_module.emg_full_fidelity = full_fidelity
+
+    best = None
+    for run in range(runs):
+        fig, point_count = make_page(report_module, samples, trace_dpi)
+
+        pdf_buffer = io.BytesIO()
+        start = time.perf_counter()
+        fig.savefig(pdf_buffer, format='pdf')
+        pdf_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        fig.savefig(io.BytesIO(), format='png', dpi=150)
+        png_s = time.perf_counter() - start
+        plt.close(fig)
+
+        result = (pdf_s, png_s, len(pdf_buffer.getvalue()), point_count)
+        if best is None or result[0] < best[0]:
+            best = result
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='PDF size and drawing time of raw EMG traces, all samples vs reduced per pixel column')
+    parser.add_argument('--samples', type=int, default=2400, help='EMG samples per trace (default: 2400, 2 kHz over 1.2 s)')
+    parser.add_argument('--dpi', type=int, default=300, help='pixel columns per inch of plot width (default: 300)')
+    parser.add_argument('--runs', type=int, default=3, help='number of runs, the fastest is reported (default: 3)')
+    args = parser.parse_args()
+
+    report_module = get_reportModule()
+    report_module.plt.switch_backend('Agg')
+
+    full = time_page(report_module, args.samples, args.dpi, True, args.runs)
+    reduced = time_page(report_module, args.samples, args.dpi, False, args.runs)
+
+    print(f'EMG page, 15 traces of {args.samples} samples, {args.dpi} dpi, fastest of {args.runs}')
+    print(f"{'':12}{'points':>10}{'pdf size':>12}{'pdf save':>12}{'png draw':>12}")
+    for label, (pdf_s, png_s, pdf_bytes, point_count) in [('every sample', full), ('reduced', reduced)]:
+        print(f'{label:12}{point_count:>10}{pdf_bytes/1024:>9.0f} kB{pdf_s*1000:>9.0f} ms{png_s*1000:>9.0f} ms')
+    print(f'pdf {full[2]/reduced[2]:.1f}x smaller, saved {full[0]/reduced[0]:.1f}x and drawn {full[1]/reduced[1]:.1f}x faster')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
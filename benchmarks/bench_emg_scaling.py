@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+'''
+Time of the EMG scaling step (Py3_AmplifyEMG_MLS.scale_MLSemg) on made up trials - no Nexus or patient data needed
+
+Writes a mock gcd with 10 raw EMG channels (TrialProviders_SGM.MockTrialProvider) to a temporary folder for each
+trial length and times reading, analysing, filtering and writing it back, e.g.
+    python benchmarks/bench_emg_scaling.py --rate 2000 --seconds 1 5 20
+'''
+import argparse
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+code_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, code_folder)
+
+import EMGspectrum_SGM
+from Py3_AmplifyEMG_MLS import scale_MLSemg
+from TrialProviders_SGM import MockTrialProvider
+
+# every run works out the spectra, the mock files are the same each run and would otherwise come from the cache
+EMGspectrum_SGM.spectrum_cache_folder = ''
+
+def time_scaling(provider, runs):
+    # a fresh mock file for every run, as scaling rewrites it
+    best = None
+    for run in range(runs):
+        filenamepath = provider.get_trialPath()
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = scale_MLSemg(filenamepath, provider=provider)
+        run_s = time.perf_counter() - start
+        if best is None or run_s < best[0]:
+            best = (run_s, result, os.path.getsize(filenamepath))
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Time of the EMG scaling step on mock trials')
+    parser.add_argument('--rate', type=float, default=2000, help='EMG sample rate in Hz (default: 2000)')
+    parser.add_argument('--seconds', type=float, nargs='+', default=[1, 5, 20], help='trial lengths in seconds (default: 1 5 20)')
+    parser.add_argument('--runs', type=int, default=3, help='number of runs, the fastest is reported (default: 3)')
+    args = parser.parse_args()
+
+    print(f"{'seconds':>8}{'samples':>10}{'file size':>12}{'scale time':>13}{'dominant Hz':>13}  scaled")
+    with tempfile.TemporaryDirectory() as folder:
+        for seconds in args.seconds:
+            samples = int(seconds*args.rate)
+            provider = MockTrialProvider(folder, SR=args.rate, samples=samples)
+            run_s, result, file_bytes = time_scaling(provider, args.runs)
+            freqs = list(result['dominant_freqs'].values())
+            print(f"{seconds:>8g}{samples:>10}{file_bytes/1024:>9.0f} kB{run_s*1000:>10.0f} ms"
+                  f"{min(freqs):>6.0f}-{max(freqs):<6.0f}  {result['scaled']}")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+'''
+Time of a batch report with the pages plotted one after another and with parallel render workers (render_workers)
+
+Runs the script without the GUI on a patient folder, once with --render-workers 1 and once for each worker count,
+writing the pdfs to a temporary folder. Each time includes starting python and the worker processes, as when a
+report button is pressed for the first time in a session, e.g.
+    python benchmarks/bench_parallel_report.py "K:/ViconDatabase/Patients/Patient Folder" --workers 2 4
+Parallel rendering should only be turned on in the site settings where this shows it is faster.
+'''
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SGMreportGenerator_v3.0.3.py')
+
+def time_report(patient_folder, report_name, workers, runs):
+    best = None
+    for run in range(runs):
+        with tempfile.TemporaryDirectory() as output_folder:
+            command = [sys.executable, script_path, patient_folder, '--report', report_name,
+                       '--output-folder', output_folder, '--render-workers', str(workers)]
+            start = time.perf_counter()
+            result = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(script_path))
+            run_s = time.perf_counter() - start
+            if result.returncode != 0:
+                print(result.stdout[-2000:])
+                raise SystemExit(f'report with {workers} workers failed (exit code {result.returncode})')
+        if best is None or run_s < best:
+            best = run_s
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch report time with and without parallel render workers')
+    parser.add_argument('patient_folder', help='patient folder with the gcd files to plot (all gcd files are used)')
+    parser.add_argument('--report', default='full', help='report to make, same as the report buttons (default: full)')
+    parser.add_argument('--workers', type=int, nargs='+', default=[2, 4], help='render worker counts to compare (default: 2 4)')
+    parser.add_argument('--runs', type=int, default=3, help='number of runs, the fastest is reported (default: 3)')
+    args = parser.parse_args()
+
+    print(f"'{args.report}' report of {args.patient_folder}, {os.cpu_count()} cpus, fastest of {args.runs}")
+    serial_s = time_report(args.patient_folder, args.report, 1, args.runs)
+    print(f"{'workers':>8}{'time':>10}{'speed up':>10}")
+    print(f"{1:>8}{serial_s:>9.1f}s{1:>9.2f}x")
+    for workers in args.workers:
+        run_s = time_report(args.patient_folder, args.report, workers, args.runs)
+        print(f"{workers:>8}{run_s:>9.1f}s{serial_s/run_s:>9.2f}x")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
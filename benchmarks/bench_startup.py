@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+'''
+Startup time of SGMreportGenerator - how long the script takes to load before the first window can be shown
+
+Runs the script in a fresh python with -X importtime (the GUI is not started) and prints the total load time
+and the slowest imports. Use --max-ms to fail (exit code 1) when startup gets slower than a set limit, e.g.
+    python benchmarks/bench_startup.py --max-ms 400
+'''
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+script_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'SGMreportGenerator_v3.0.3.py')
+
+def get_importTimes(stderr_text):
+    # -X importtime lines look like: "import time:       123 |       4567 |   matplotlib.pyplot"
+    import_times = []
+    for line in stderr_text.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, module_name = line[len('import time:'):].split('|')
+        import_times.append((int(cumulative_us), int(self_us), module_name.rstrip()))
+    return import_times
+
+def run_startup():
+    # run_path with a name other than __main__ loads everything the GUI needs but does not open it
+    command = [sys.executable, '-X', 'importtime', '-c',
+               f'import runpy; runpy.run_path({script_path!r}, run_name="bench_startup")']
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, cwd=os.path.dirname(script_path))
+    wall_ms = (time.perf_counter() - start)*1000
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f'SGMreportGenerator did not load (exit code {result.returncode})')
+    return wall_ms, get_importTimes(result.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description='Startup time of SGMreportGenerator')
+    parser.add_argument('--runs', type=int, default=5, help='number of runs, the fastest is reported (default: 5)')
+    parser.add_argument('--top', type=int, default=15, help='number of slowest imports to list (default: 15)')
+    parser.add_argument('--max-ms', type=float, help='exit with code 1 if startup takes longer than this')
+    args = parser.parse_args()
+
+    runs = [run_startup() for run in range(args.runs)]
+    wall_ms, import_times = min(runs, key=lambda run: run[0])
+
+    # top level imports only (not indented in the importtime output), these add up to the import part of startup
+    top_level = [entry for entry in import_times if not entry[2].startswith('  ')]
+    import_ms = sum(entry[0] for entry in top_level)/1000
+
+    print(f'startup (python start to script loaded), fastest of {args.runs}: {wall_ms:.0f} ms')
+    print(f'imports: {import_ms:.0f} ms in {len(import_times)} modules')
+    print('\nslowest top level imports:')
+    for cumulative_us, self_us, module_name in sorted(top_level, reverse=True)[:args.top]:
+        print(f'{cumulative_us/1000:9.1f} ms  {module_name.strip()}')
+
+    if args.max_ms is not None and wall_ms > args.max_ms:
+        print(f'\nstartup {wall_ms:.0f} ms is over the {args.max_ms:.0f} ms limit')
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
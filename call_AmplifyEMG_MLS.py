@@ -1,107 +1,115 @@
-# -*- coding: utf-8 -*-
-"""
-Created on Tue Jun  3 12:58:54 2025
-
-@author: Vicon-OEM
-"""
-# from Py3_AmplifyEMG_MLS import scale_MLSemg as sgcd
-import numpy as np
-
-filenamepath = r'K:\ViconDatabase\Python Code\Py3_AmplifyEMG_MLS\E01-6577322-02_Unprocessed.GCD'
-
-# sgcd(filenamepath)
-
-def get_dominantFFT(data, SR):
-    # 'signal' is the data, 'SR' is the sample rate
-    
-    # number of samples 
-    N = len(data)
-    
-    # subtract mean to reduce issues with dominant frequency analysis due to strong DC component of the signal
-    data = data - np.mean(data)
-    
-    # computer FFT
-    fft_val = np.fft.fft(data)
-    freqs = np.fft.fftfreq(N, d=1/SR) # frequency bins
-    
-    # find dominant frequncy
-    dom_idx = np.argmax(np.abs(fft_val[:N//2])) # only positive frequecy values
-    dom_frq = freqs[dom_idx]
-    
-    # code to plot frequency analysis if desired
-    # **Optional: Plot Frequency Spectrum**
-    # plt.plot(freqs[:N//2], np.abs(fft_val[:N//2]))  # Only positive frequencies
-    # plt.xlabel("Frequency (Hz)")
-    # plt.ylabel("Amplitude")
-    # plt.title("Muscle Activity Frequency Spectrum")
-    # plt.show()
-    
-    return dom_frq
-    
-
-# initialize dominant frequency list
-dfrq_list = []
-# ----------------------------- Get data ------------------------------
-f = open(filenamepath, 'r+')
-data = f.readlines()
-
-# ---------------------------- Get headers ----------------------------
-headerIndex = [idx for idx, line in enumerate(data) if line[0] == '!']
-   
-# ----------------------------- Convert data --------------------------
-for idx, num in enumerate(headerIndex):
-    # pull keys and asign to temporary variable
-    key = data[headerIndex[idx]][1:-1]
-    
-    if 'Raw' in key and 'Envelope' not in key:
-        # pull data associated with given emg data, minus "\n" and convert to float
-        try:
-            # get all values of data for key associated with headerIndex[num] up to next headerIndex[num+1]
-            val = data[headerIndex[idx]+1:headerIndex[idx+1]]
-        except:
-            # same as above but for the reamining set of data for the last key
-            val = data[headerIndex[idx]+1:]
-                
-        # convert values to float
-        values = []
-        
-        for i in val:
-            try:
-                value = float(i)
-                values.append(value)    
-            except:
-                continue
-        
-        # get and apply scaled emg data
-        emg = np.array(values)
-        
-        if 'SR' not in locals():
-            SR = 1000
-            print('EMG sample rate not extracted from Vicon, using default sample rate of 1000 Hz')
-            
-        # frequency analysis            
-        dominant_freq = get_dominantFFT(emg, SR)
-        print(f'dominant frequency is: {dominant_freq}')
-        
-        # physiological frequencies should be found in order to justify scaling data
-        if dominant_freq > 19 and dominant_freq < 501:
-            dfrq_list.append(dominant_freq)
-            # scale signal if dominant frequency meets criteria
-            scale_val = abs(emg).max()
-            scaled_emg = emg * 4 / scale_val
-            
-            # replace unscaled with scaled data
-            datastring = [str(emgstr)+'\n' for emgstr in scaled_emg]            
-            data[headerIndex[idx]+1:headerIndex[idx]+1+len(datastring)] = datastring
-
-# close original file
-print(dfrq_list)
-f.close()
-
-if min(dfrq_list) > 19 and max(dfrq_list) < 501:
-    # save new data over old file
-    with open(filenamepath, 'w') as newfile:
-        for item in data:
-            newfile.write(item)
-        
-        newfile.close()
\ No newline at end of file
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Jun  3 12:58:54 2025
+
+@author: Vicon-OEM
+
+Scale the EMG of every gcd file in a session or patient folder without opening the trials in Nexus
+
+    python call_AmplifyEMG_MLS.py "K:/ViconDatabase/Patients/Patient Folder" --rate 1000
+
+Folders are searched with all their sub folders, and gcd files with raw EMG are scaled in parallel with
+Py3_AmplifyEMG_MLS.scale_MLSemg. GCD files exported by Nexus do not hold the EMG sample rate, so --rate is used for
+them - set it to the rate of the lab's EMG system. Files with an added !EMGSampleRate section use that instead. A table of the dominant EMG frequencies and whether each file was scaled is printed at the end.
+"""
+import argparse
+import concurrent.futures
+import contextlib
+import io
+import os
+import sys
+
+from Py3_AmplifyEMG_MLS import scale_MLSemg
+from TrialProviders_SGM import FileTrialProvider, rate_key
+from EMGspectrum_SGM import prune_spectrumCache
+
+def find_gcdFiles(folders):
+    # gcd files in the folders and all their sub folders, in name order - gcd files can also be given directly
+    gcd_files = []
+    for folder in folders:
+        if os.path.isfile(folder):
+            gcd_files.append(folder)
+            continue
+        for dirpath, dirnames, filenames in os.walk(folder):
+            dirnames.sort()
+            gcd_files += [os.path.join(dirpath, name) for name in sorted(filenames) if name.lower().endswith('.gcd')]
+    return gcd_files
+
+def has_rawEMG(filenamepath):
+    # whether the file has raw EMG to scale
+    with open(filenamepath, 'r') as f:
+        for line in f:
+            if line[0] == '!' and 'Raw' in line and 'Envelope' not in line:
+                return True
+    return False
+
+def scale_gcdFile(filenamepath, default_rate):
+    # runs in a worker process - the printed output is returned with the result so the logs of the files do not mix
+    job_output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(job_output):
+            if not has_rawEMG(filenamepath):
+                result = {'SR': None, 'dominant_freqs': {}, 'status': 'no EMG'}
+            else:
+                # rate section of the file, or --rate - never Nexus
+                result = scale_MLSemg(filenamepath, provider=FileTrialProvider(default_rate=default_rate))
+                result['status'] = 'PASS' if result['scaled'] else 'FAIL'
+    except Exception as e:
+        result = {'SR': None, 'dominant_freqs': {}, 'status': f'ERROR: {e}'}
+    result['output'] = job_output.getvalue()
+    return result
+
+def get_displayNames(gcd_files):
+    # file names relative to the folder they were all found in, full paths if they have nothing in common (e.g. other drives)
+    try:
+        common_folder = os.path.commonpath([os.path.dirname(os.path.abspath(gcd_file)) for gcd_file in gcd_files])
+        return [os.path.relpath(os.path.abspath(gcd_file), common_folder) for gcd_file in gcd_files]
+    except ValueError:
+        return list(gcd_files)
+
+def print_summary(gcd_files, results):
+    file_names = get_displayNames(gcd_files)
+    name_width = max(len('File'), *(len(file_name) for file_name in file_names))
+
+    print(f"\n{'File':<{name_width}}  {'Rate (Hz)':>9}  {'EMG':>3}  {'Dominant freq (Hz)':>18}  Result")
+    for file_name, result in zip(file_names, results):
+        freqs = list(result['dominant_freqs'].values())
+        freq_range = f'{min(freqs):.1f} - {max(freqs):.1f}' if freqs else '-'
+        rate = f"{result['SR']:g}" if result['SR'] else '-'
+        print(f"{file_name:<{name_width}}  {rate:>9}  {len(freqs):>3}  {freq_range:>18}  {result['status']}")
+
+    counts = {}
+    for result in results:
+        status = result['status'].split(':')[0]
+        counts[status] = counts.get(status, 0) + 1
+    print('\n' + ', '.join(f'{count} {status}' for status, count in counts.items()) + f' of {len(results)} gcd files')
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Scale the raw EMG of all gcd files in session or patient folders')
+    parser.add_argument('folders', nargs='+', help='session or patient folders (searched with all sub folders) or gcd files')
+    parser.add_argument('--rate', type=float, default=1000, help=f'EMG sample rate in Hz (default: 1000). Nexus gcd exports do not hold the rate, so this is used for them - only files with an added !{rate_key} section use their own')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='number of files scaled at the same time (default: number of cpus)')
+    parser.add_argument('--verbose', action='store_true', help='print the output of each file as it is scaled')
+    args = parser.parse_args(argv)
+
+    gcd_files = find_gcdFiles(args.folders)
+    if not gcd_files:
+        print(f"No gcd files found in {', '.join(args.folders)}")
+        return 1
+
+    results = []
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        for gcd_file, result in zip(gcd_files, pool.map(scale_gcdFile, gcd_files, [args.rate]*len(gcd_files))):
+            results.append(result)
+            print(f"[{len(results)}/{len(gcd_files)}] {result['status']}  {gcd_file}")
+            if args.verbose and result['output']:
+                print(result['output'], end='')
+
+    print_summary(gcd_files, results)
+
+    # spectra of gcd files not scaled for a long time
+    prune_spectrumCache()
+    return 1 if any(result['status'].startswith('ERROR') for result in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))